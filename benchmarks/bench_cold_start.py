@@ -0,0 +1,66 @@
+"""Measure the cold start of the API: seconds until the first successful /predictions/json.
+
+Each scenario runs in a fresh interpreter, from importing the app to the first
+200 response, once with a saved model and once without one (which needs training).
+
+Usage: python benchmarks/bench_cold_start.py [model_path]
+"""
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from animal_shelter.paths import DefaultPaths
+
+COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from animal_shelter.paths import DefaultPaths
+DefaultPaths.ANIMAL_MODEL_PATH = DefaultPaths.ANIMAL_MODEL_PATH.__class__(sys.argv[1])
+
+from fastapi.testclient import TestClient
+from animal_shelter.main import app
+imported = time.perf_counter()
+
+animal = {"id": 1, "name": "Rocky", "date_time": "2014-01-01T10:00:00", "animal_type": "Dog",
+          "sex_upon_outcome": "Neutered Male", "age_upon_outcome": "2 years", "breed": "Pit Bull Mix",
+          "color": "Brown/White"}
+with TestClient(app) as client:
+    started = time.perf_counter()
+    while (response := client.post("/predictions/json", json=animal)).status_code != 200:
+        if response.status_code != 503:
+            raise SystemExit(f"unexpected status {response.status_code}: {response.text}")
+        time.sleep(0.02)
+    predicted = time.perf_counter()
+
+print(json.dumps({"import_s": imported - start, "startup_s": started - imported,
+                  "first_prediction_s": predicted - started, "total_s": predicted - start}))
+"""
+
+
+def cold_start(model_path: Path) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT, str(model_path)], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(model_path: Path = DefaultPaths.ANIMAL_MODEL_PATH):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        saved_path = Path(tmp_dir) / "saved" / "animal_model.gz"
+        saved_path.parent.mkdir()
+        shutil.copy(model_path, saved_path)
+        results["saved_model"] = cold_start(saved_path)
+        results["missing_model"] = cold_start(Path(tmp_dir) / "missing" / "animal_model.gz")
+
+    print("seconds from a fresh interpreter to the first successful /predictions/json")
+    print(pd.DataFrame(results).T.to_string(float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
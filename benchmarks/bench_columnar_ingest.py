@@ -0,0 +1,53 @@
+"""Compare turning a request body into a DataFrame for the batch request formats.
+
+Each variant starts from the raw body bytes and ends with the frame that is
+passed to predict(), which is the part that differs between the endpoints.
+
+Usage: python benchmarks/bench_columnar_ingest.py [n_rows]
+"""
+import io
+import json
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from animal_shelter.helper.data_loader import standardize
+from animal_shelter.model.domain import AnimalPrediction, ColumnarAnimalPrediction, ListAnimalPrediction
+from animal_shelter.model.tables import read_table
+from common import best_of, make_raw_animals
+
+
+def ingest_json_list(body: bytes) -> pd.DataFrame:
+    animals = ListAnimalPrediction.model_validate(json.loads(body)).predictions
+    return pd.DataFrame.from_records([animal.model_dump() for animal in animals])
+
+
+def ingest_json_columns(body: bytes) -> pd.DataFrame:
+    return pd.DataFrame(ColumnarAnimalPrediction.model_validate(json.loads(body)).model_dump())
+
+
+def main(n_rows: int = 50_000):
+    animals = standardize(make_raw_animals(n_rows))[list(AnimalPrediction.model_fields)]
+    records = json.loads(animals.to_json(orient="records", date_format="iso"))
+    table = pa.Table.from_pandas(animals, preserve_index=False)
+
+    arrow_body = pa.BufferOutputStream()
+    with pa.ipc.new_stream(arrow_body, table.schema) as writer:
+        writer.write_table(table)
+    parquet_body = io.BytesIO()
+    pq.write_table(table, parquet_body)
+
+    timings = pd.Series({
+        "json_list": best_of(ingest_json_list, json.dumps({"predictions": records}).encode()),
+        "json_columns": best_of(ingest_json_columns, json.dumps(animals.to_dict(orient="list"), default=str).encode()),
+        "arrow": best_of(read_table, arrow_body.getvalue().to_pybytes(), "arrow"),
+        "parquet": best_of(read_table, parquet_body.getvalue(), "parquet"),
+    }, name="seconds")
+    print(f"ingesting {n_rows:,} animals")
+    print(timings.to_frame().assign(speedup=timings["json_list"] / timings).to_string(float_format="{:.3f}".format))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,48 @@
+"""Compare the previous split/apply age parsing with the vectorized lookup.
+
+Usage: python benchmarks/bench_days_upon_outcome.py [n_rows]
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_series_equal
+
+from animal_shelter.feature.enhancer import compute_days_upon_outcome
+from common import best_of, make_raw_outcomes
+
+
+def split_apply_days_upon_outcome(age_upon_outcome):
+    """Implementation of compute_days_upon_outcome before vectorization."""
+    split_age = age_upon_outcome.str.split()
+    time = split_age.apply(lambda x: x[0] if x[0] != "Unknown" else np.nan)
+    period = split_age.apply(lambda x: x[1] if x[0] != "Unknown" else None)
+    period_mapping = {
+        "year": 365,
+        "years": 365,
+        "weeks": 7,
+        "week": 7,
+        "month": 30,
+        "months": 30,
+        "days": 1,
+        "day": 1,
+    }
+
+    return time.astype(float) * period.map(period_mapping)
+
+
+def main(n_rows: int = 1_000_000):
+    ages = make_raw_outcomes(n_rows)["AgeuponOutcome"].fillna("Unknown").rename("age_upon_outcome")
+
+    assert_series_equal(compute_days_upon_outcome(ages), split_apply_days_upon_outcome(ages))
+
+    timings = pd.Series({
+        "split_apply": best_of(split_apply_days_upon_outcome, ages),
+        "vectorized": best_of(compute_days_upon_outcome, ages),
+    }, name="seconds")
+    print(f"compute_days_upon_outcome on {n_rows:,} rows")
+    print(timings.to_frame().assign(speedup=timings["split_apply"] / timings).to_string())
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
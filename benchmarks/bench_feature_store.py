@@ -0,0 +1,34 @@
+"""Compare computing features with cold and warm reads of the feature cache.
+
+Usage: python benchmarks/bench_feature_store.py [n_rows]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from animal_shelter.feature.store import load_features
+from common import best_of, make_raw_outcomes
+
+
+def main(n_rows: int = 1_000_000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_file = Path(tmp_dir) / "outcomes.csv"
+        cache_dir = Path(tmp_dir) / "cache"
+        make_raw_outcomes(n_rows).to_csv(csv_file, index=False)
+
+        uncached = best_of(load_features, csv_file, cache_dir, use_cache=False, repeat=1)
+        start = time.perf_counter()
+        load_features(csv_file, cache_dir)
+        cold = time.perf_counter() - start
+        warm = best_of(load_features, csv_file, cache_dir)
+
+    timings = pd.Series({"no_cache": uncached, "cold": cold, "warm": warm}, name="seconds")
+    print(f"load_features on {n_rows:,} rows")
+    print(timings.to_frame().to_string(float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
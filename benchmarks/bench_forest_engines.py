@@ -0,0 +1,35 @@
+"""Compare sklearn and flattened forest evaluation across batch sizes.
+
+Usage: python benchmarks/bench_forest_engines.py
+"""
+import pandas as pd
+
+from animal_shelter.feature.default_features import DefaultFeatures
+from animal_shelter.feature.enhancer import add_features
+from animal_shelter.helper.data_loader import standardize
+from animal_shelter.model.forest import forest_predict_proba
+from animal_shelter.model.predict import _load_model
+from animal_shelter.paths import DefaultPaths
+from common import best_of, make_raw_outcomes
+
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000]
+
+
+def main():
+    model = _load_model(DefaultPaths.ANIMAL_MODEL_PATH)
+    raw_data = standardize(make_raw_outcomes(max(BATCH_SIZES)))
+    features = add_features(raw_data)[DefaultFeatures.CATEGORY_FEATURES + DefaultFeatures.NUM_FEATURES]
+    xt = model[:-1].transform(features)
+    forest_predict_proba(model, xt[:1], engine="flat")  # flatten the forest once
+
+    results = pd.DataFrame({
+        engine: {size: best_of(forest_predict_proba, model, xt[:size], engine) * 1000 for size in BATCH_SIZES}
+        for engine in ["sklearn", "flat"]
+    })
+    results.index.name = "rows"
+    print("forest evaluation time in ms")
+    print(results.to_string(float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main()
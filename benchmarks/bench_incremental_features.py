@@ -0,0 +1,39 @@
+"""Compare a full feature recompute with an incremental refresh after a daily append.
+
+Usage: python benchmarks/bench_incremental_features.py [history_rows] [appended_rows]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from animal_shelter.feature.store import compute_features, update_feature_table
+from common import make_raw_outcomes
+
+
+def main(history_rows: int = 1_000_000, appended_rows: int = 10_000):
+    outcomes = make_raw_outcomes(history_rows + appended_rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_file = Path(tmp_dir) / "outcomes.csv"
+        outcomes[:history_rows].to_csv(csv_file, index=False)
+        update_feature_table(csv_file, tmp_dir)
+
+        outcomes[history_rows:].to_csv(csv_file, mode="a", header=False, index=False)
+        start = time.perf_counter()
+        update_feature_table(csv_file, tmp_dir)
+        incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compute_features(csv_file)
+        full = time.perf_counter() - start
+
+    timings = pd.Series({"full_recompute": full, "incremental_refresh": incremental}, name="seconds")
+    print(f"refresh after appending {appended_rows:,} rows to {history_rows:,}")
+    print(timings.to_frame().to_string(float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,41 @@
+"""Compare a full retrain with an incremental (warm start) one after a daily append.
+
+Usage: python benchmarks/bench_incremental_train.py [history_rows] [appended_rows]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from animal_shelter.model.train import train
+from common import make_raw_outcomes
+
+
+def main(history_rows: int = 200_000, appended_rows: int = 2_000):
+    outcomes = make_raw_outcomes(history_rows + appended_rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        csv_file, model_file, cache_dir = tmp_dir / "outcomes.csv", tmp_dir / "model.gz", tmp_dir / "cache"
+        outcomes[:history_rows].to_csv(csv_file, index=False)
+        train(csv_file, model_file, incremental=True, feature_cache_dir=cache_dir)
+
+        outcomes[history_rows:].to_csv(csv_file, mode="a", header=False, index=False)
+        start = time.perf_counter()
+        train(csv_file, model_file, incremental=True, feature_cache_dir=cache_dir)
+        incremental = time.perf_counter() - start
+
+        # Features are cached by now, so both timings cover the fit and saving the model.
+        start = time.perf_counter()
+        train(csv_file, tmp_dir / "full.gz", feature_cache_dir=cache_dir)
+        full = time.perf_counter() - start
+
+    timings = pd.Series({"full_retrain": full, "incremental_retrain": incremental}, name="seconds")
+    print(f"retrain after appending {appended_rows:,} rows to {history_rows:,}")
+    print(timings.to_frame().to_string(float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
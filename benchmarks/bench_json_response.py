@@ -0,0 +1,53 @@
+"""Compare encoding prediction frames as JSON across batch sizes.
+
+fastapi is the previous path, to_dict(orient="records") encoded by
+jsonable_encoder and json; records and columns are the two layouts of
+frame_to_json.
+
+Usage: python benchmarks/bench_json_response.py
+"""
+import json
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+from animal_shelter.helper.serialization import HAS_ORJSON, frame_to_json
+from common import best_of
+
+BATCH_SIZES = [1, 100, 1_000, 10_000, 100_000]
+CLASSES = ["adoption", "died", "euthanasia", "return_to_owner", "transfer"]
+
+
+def make_predictions(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    proba = rng.dirichlet(np.ones(len(CLASSES)), n_rows)
+    return pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "name": rng.choice(["Rex", "Bella", "Unknown"], n_rows).astype(object),
+        **dict(zip(CLASSES, proba.T)),
+    })
+
+
+def encode_fastapi(predictions: pd.DataFrame) -> bytes:
+    return json.dumps(jsonable_encoder(predictions.to_dict(orient="records"))).encode()
+
+
+def main():
+    results = {}
+    for size in BATCH_SIZES:
+        predictions = make_predictions(size)
+        results[size] = {
+            "fastapi": best_of(encode_fastapi, predictions) * 1000,
+            "records": best_of(frame_to_json, predictions, "records") * 1000,
+            "columns": best_of(frame_to_json, predictions, "columns") * 1000,
+        }
+
+    results = pd.DataFrame(results).T
+    results.index.name = "rows"
+    print(f"JSON encoding time in ms ({'orjson' if HAS_ORJSON else 'json'})")
+    print(results.to_string(float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Compare load time and memory footprint of the load_data variants.
+
+Usage: python benchmarks/bench_load_data.py [n_rows]
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from animal_shelter.helper.data_loader import load_data
+from common import best_of, make_raw_outcomes
+
+VARIANTS = {
+    "default": {},
+    "typed": {"typed": True},
+    "typed_pyarrow": {"typed": True, "engine": "pyarrow"},
+}
+
+
+def main(n_rows: int = 1_000_000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_file = Path(tmp_dir) / "outcomes.csv"
+        make_raw_outcomes(n_rows).to_csv(csv_file, index=False)
+
+        results = {}
+        for name, options in VARIANTS.items():
+            results[name] = {
+                "seconds": best_of(load_data, csv_file, **options),
+                "memory_mb": load_data(csv_file, **options).memory_usage(deep=True).sum() / 2**20,
+            }
+
+    print(f"load_data on {n_rows:,} rows")
+    print(pd.DataFrame(results).T.to_string(float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,72 @@
+"""Compare file size, load time and resident memory of the model artifact formats.
+
+Every format is loaded in a fresh process with mmap_mode="r", which only maps
+the uncompressed compact format, and then predicts a small batch so lazily
+mapped pages are counted.
+
+Usage: python benchmarks/bench_model_artifacts.py [model_path]
+"""
+import importlib.util
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+from animal_shelter.model.train import ARTIFACT_FORMATS, _save_model, train
+from animal_shelter.paths import DefaultPaths
+
+LOAD_SCRIPT = """
+import json, sys, time
+import joblib, pandas as pd
+from animal_shelter.feature.default_features import DefaultFeatures
+from animal_shelter.feature.enhancer import add_features
+from animal_shelter.helper.data_loader import load_data
+from animal_shelter.model import train  # imports the sklearn classes, keeping imports out of the load time
+
+def rss_mib():
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) for line in status if line.startswith("VmRSS")) / 1024
+
+x = add_features(load_data(sys.argv[2]))[DefaultFeatures.CATEGORY_FEATURES + DefaultFeatures.NUM_FEATURES]
+before = rss_mib()
+start = time.perf_counter()
+model = joblib.load(sys.argv[1], mmap_mode="r")
+load_seconds = time.perf_counter() - start
+loaded = rss_mib()
+model.predict_proba(x)
+print(json.dumps({"load_s": load_seconds, "rss_loaded_mib": loaded - before, "rss_predicted_mib": rss_mib() - before}))
+"""
+
+
+def main(model_path: Path = DefaultPaths.ANIMAL_MODEL_PATH):
+    model_path = Path(model_path)
+    if not model_path.exists():
+        train(DefaultPaths.DATA_PATH / "train.csv", model_path)
+    model = joblib.load(model_path)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sample = Path(tmp_dir) / "sample.csv"
+        pd.read_csv(DefaultPaths.DATA_PATH / "train.csv", nrows=1_000).to_csv(sample, index=False)
+
+        for artifact_format, (_, compress) in ARTIFACT_FORMATS.items():
+            if compress is not None and compress[0] == "lz4" and importlib.util.find_spec("lz4") is None:
+                print(f"skipping {artifact_format}, lz4 is not installed")
+                continue
+            path = Path(tmp_dir) / f"model-{artifact_format}.gz"
+            _save_model(model, path, artifact_format)
+            output = subprocess.run(
+                [sys.executable, "-c", LOAD_SCRIPT, str(path), str(sample)], check=True, capture_output=True, text=True
+            ).stdout
+            results[artifact_format] = {"size_mib": path.stat().st_size / 2**20, **json.loads(output)}
+
+    print(f"model artifacts of {model_path}, loaded in a fresh process")
+    print(pd.DataFrame(results).T.to_string(float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
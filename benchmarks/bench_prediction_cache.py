@@ -0,0 +1,57 @@
+"""Compare scoring every row with deduplicated batches and the prediction cache.
+
+Usage: python benchmarks/bench_prediction_cache.py [n_rows] [batch_rows]
+"""
+import sys
+
+import pandas as pd
+
+from animal_shelter.feature.default_features import DefaultFeatures
+from animal_shelter.feature.enhancer import add_features
+from animal_shelter.helper.data_loader import standardize
+from animal_shelter.model.prediction_cache import PredictionCache
+from animal_shelter.model.predict import _load_model, predict
+from animal_shelter.model.train import train
+from animal_shelter.paths import DefaultPaths
+from common import best_of, make_raw_animals
+
+
+def predict_every_row(raw_data: pd.DataFrame, pipeline) -> pd.DataFrame:
+    # What predict did before deduplication: every row goes through the whole pipeline.
+    x = add_features(raw_data)[DefaultFeatures.CATEGORY_FEATURES + DefaultFeatures.NUM_FEATURES]
+    return pd.DataFrame(pipeline.predict_proba(x), index=raw_data.index)
+
+
+def predict_batches(batches: list[pd.DataFrame], pipeline, cache: PredictionCache | None) -> None:
+    for batch in batches:
+        predict(batch, pipeline, cache=cache)
+
+
+def main(n_rows: int = 100_000, batch_rows: int = 1_000):
+    if not DefaultPaths.ANIMAL_MODEL_PATH.exists():
+        train(DefaultPaths.DATA_PATH / "train.csv", DefaultPaths.ANIMAL_MODEL_PATH)
+    pipeline = _load_model(DefaultPaths.ANIMAL_MODEL_PATH)
+    raw_data = standardize(make_raw_animals(n_rows, seed=0))
+    batches = [raw_data.iloc[start:start + batch_rows] for start in range(0, n_rows, batch_rows)]
+
+    cache = PredictionCache(max_size=10_000)
+    predict_batches(batches, pipeline, cache)
+    cold_stats = cache.stats.as_dict()
+
+    timings = {
+        "every_row": best_of(predict_every_row, raw_data, pipeline),
+        "dedup": best_of(predict, raw_data, pipeline, cache=None),
+        f"every_row_{batch_rows}_batches": best_of(
+            lambda: [predict_every_row(batch, pipeline) for batch in batches]
+        ),
+        f"dedup_{batch_rows}_batches": best_of(predict_batches, batches, pipeline, None),
+        f"cached_{batch_rows}_batches": best_of(predict_batches, batches, pipeline, cache),
+    }
+    print(f"scoring {n_rows:,} animals, best of 3")
+    print(pd.Series(timings, name="seconds").to_frame().to_string(float_format="{:.3f}".format))
+    print(f"first pass over {len(batches)} batches: hit rate {cold_stats['hit_rate']:.1%}, "
+          f"dedup ratio {cold_stats['dedup_ratio']:.1%}, {len(cache)} cached vectors")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,38 @@
+"""Compare single-animal latency of the pandas path and the compiled record path.
+
+Usage: python benchmarks/bench_single_prediction.py [n_calls]
+"""
+import sys
+
+import pandas as pd
+
+from animal_shelter.model.domain import AnimalPrediction
+from animal_shelter.model.fast_predict import predict_record
+from animal_shelter.model.predict import predict_json
+from animal_shelter.paths import DefaultPaths
+from common import best_of
+
+ANIMAL = AnimalPrediction(
+    id=1, name="Rex", date_time="2015-01-01T00:00:00", animal_type="Dog", sex_upon_outcome="Neutered Male",
+    age_upon_outcome="2 years", breed="Labrador Retriever Mix", color="Black",
+)
+
+
+def call_repeatedly(func, n_calls):
+    for _ in range(n_calls):
+        func(ANIMAL, DefaultPaths.ANIMAL_MODEL_PATH)
+
+
+def main(n_calls: int = 200):
+    predict_record(ANIMAL, DefaultPaths.ANIMAL_MODEL_PATH)  # load and compile the model once
+
+    latency_ms = pd.Series({
+        "predict_json": best_of(call_repeatedly, predict_json, n_calls) / n_calls * 1000,
+        "predict_record": best_of(call_repeatedly, predict_record, n_calls) / n_calls * 1000,
+    }, name="ms_per_call")
+    print(f"single-animal latency over {n_calls} calls with {DefaultPaths.ANIMAL_MODEL_PATH.name}")
+    print(latency_ms.to_frame().to_string(float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
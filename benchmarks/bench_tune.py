@@ -0,0 +1,34 @@
+"""Time the hyperparameter search with and without caching the preprocessing.
+
+Usage: python benchmarks/bench_tune.py [n_rows] [n_candidates]
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from animal_shelter.model.tune import tune
+from common import make_raw_outcomes
+
+
+def main(n_rows: int = 30_000, n_candidates: int = 9):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        csv_file = tmp_dir / "outcomes.csv"
+        make_raw_outcomes(n_rows).to_csv(csv_file, index=False)
+
+        timings = {}
+        for use_cache in (False, True):
+            summary = tune(csv_file, tmp_dir / "model.gz", tmp_dir / "results.csv", n_candidates=n_candidates,
+                           min_estimators=10, max_estimators=90, use_cache=use_cache, random_state=0,
+                           feature_cache_dir=tmp_dir / "cache")
+            timings["cached" if use_cache else "uncached"] = summary.seconds
+
+    timings = pd.Series(timings, name="seconds")
+    print(f"search over {n_candidates} candidates on {n_rows:,} rows")
+    print(timings.to_frame().to_string(float_format="{:.2f}".format))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
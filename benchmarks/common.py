@@ -0,0 +1,39 @@
+"""Shared helpers for the benchmark scripts: synthetic data and timing."""
+import time
+
+import numpy as np
+import pandas as pd
+
+from animal_shelter.paths import DefaultPaths
+
+
+def make_raw_outcomes(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Build a synthetic frame with the layout of data/train.csv.
+
+    Every column is resampled independently from the training data, so the
+    value distributions are realistic while the rows themselves are new.
+    """
+    source = pd.read_csv(DefaultPaths.DATA_PATH / "train.csv")
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame({
+        column: source[column].to_numpy()[rng.integers(0, len(source), n_rows)]
+        for column in source.columns
+    })
+
+
+def make_raw_animals(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Build a synthetic frame with the layout of data/test.csv, as clients send it for prediction."""
+    outcomes = make_raw_outcomes(n_rows, seed).drop(columns=["AnimalID", "OutcomeType", "OutcomeSubtype"])
+    return outcomes.rename_axis("ID").reset_index().assign(ID=lambda df: df["ID"] + 1)
+
+
+def best_of(func, *args, repeat: int = 3, **kwargs) -> float:
+    """Return the fastest wall-clock time in seconds over a number of runs."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
@@ -0,0 +1,308 @@
+"""Benchmark suite for the load, feature, train and predict hot paths.
+
+Every case runs on synthetic data of each requested size and keeps the best
+of a few runs. Results are written to a JSON file and compared with a stored
+baseline, so a slower change shows up as a regression.
+
+Usage:
+    python benchmarks/suite.py                            # all cases, 10k/100k/1M rows
+    python benchmarks/suite.py --sizes 10000 -k predict   # cases with "predict" in their name
+    python benchmarks/suite.py --save-baseline            # store the results as the new baseline
+
+Exits with status 1 when a case is slower than its baseline by more than --threshold.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cached_property, partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from animal_shelter.feature import enhancer
+from animal_shelter.helper.data_loader import load_data, standardize
+from animal_shelter.model import train as train_module
+from animal_shelter.model.domain import AnimalPrediction
+from animal_shelter.model.predict import predict
+from animal_shelter.model.prediction_cache import PREDICTION_CACHE, PredictionCache
+from animal_shelter.paths import DefaultPaths
+from common import best_of, make_raw_animals, make_raw_outcomes
+
+BENCHMARKS_PATH = Path(__file__).parent
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+@dataclass
+class Case:
+    name: str
+    prepare: Callable[["Workload"], Callable[[], object]]
+    max_rows: int | None = None
+    fixed_rows: int | None = None
+
+    def sizes(self, sizes: list[int]) -> list[int]:
+        if self.fixed_rows is not None:
+            return [self.fixed_rows]
+        return [size for size in sizes if self.max_rows is None or size <= self.max_rows]
+
+
+CASES: list[Case] = []
+
+
+def benchmark(name: str, max_rows: int | None = None, fixed_rows: int | None = None):
+    """Register a case; the decorated function turns a workload into the call to time."""
+    def register(prepare):
+        CASES.append(Case(name, prepare, max_rows, fixed_rows))
+        return prepare
+
+    return register
+
+
+class Workload:
+    """Synthetic data of one size, generated on first use and shared by the cases."""
+
+    def __init__(self, rows: int, tmp_dir: Path, model_path: Path):
+        self.rows = rows
+        self.tmp_dir = tmp_dir
+        self.model_path = model_path
+
+    @cached_property
+    def outcomes_csv(self) -> Path:
+        path = self.tmp_dir / f"outcomes-{self.rows}.csv"
+        make_raw_outcomes(self.rows).to_csv(path, index=False)
+        return path
+
+    @cached_property
+    def raw_outcomes(self) -> pd.DataFrame:
+        return pd.read_csv(self.outcomes_csv)
+
+    @cached_property
+    def outcomes(self) -> pd.DataFrame:
+        return load_data(self.outcomes_csv)
+
+    @cached_property
+    def animals(self) -> pd.DataFrame:
+        return make_raw_animals(self.rows)
+
+    @cached_property
+    def animals_csv(self) -> bytes:
+        return self.animals.to_csv(index=False).encode()
+
+
+@benchmark("load_data")
+def bench_load_data(workload):
+    return partial(load_data, workload.outcomes_csv)
+
+
+@benchmark("standardize")
+def bench_standardize(workload):
+    return partial(standardize, workload.raw_outcomes)
+
+
+def _enhancer_case(feature, column):
+    @benchmark(f"enhancer.{feature.__name__}")
+    def bench_enhancer(workload):
+        return partial(feature, workload.outcomes[column])
+
+
+for _feature, _column in [
+    (enhancer.check_is_dog, "animal_type"),
+    (enhancer.check_has_name, "name"),
+    (enhancer.get_sex, "sex_upon_outcome"),
+    (enhancer.get_neutered, "sex_upon_outcome"),
+    (enhancer.get_hair_type, "breed"),
+    (enhancer.compute_days_upon_outcome, "age_upon_outcome"),
+]:
+    _enhancer_case(_feature, _column)
+
+
+@benchmark("add_features")
+def bench_add_features(workload):
+    return partial(enhancer.add_features, workload.outcomes)
+
+
+@benchmark("add_features.memoize")
+def bench_add_features_memoize(workload):
+    return partial(enhancer.add_features, workload.outcomes, memoize=True)
+
+
+@benchmark("train", max_rows=100_000)
+def bench_train(workload):
+    return partial(train_module.train, workload.outcomes_csv, workload.tmp_dir / "model.gz", use_feature_cache=False)
+
+
+# The predict cases score every batch without the prediction cache, otherwise the warm up
+# call would fill it and the timed runs would only measure cache hits.
+@benchmark("predict")
+def bench_predict(workload):
+    raw_data = standardize(workload.animals)
+    return partial(predict, raw_data, workload.model_path, cache=None)
+
+
+@benchmark("predict.memoize")
+def bench_predict_memoize(workload):
+    raw_data = standardize(workload.animals)
+    return partial(predict, raw_data, workload.model_path, memoize=True, cache=None)
+
+
+@benchmark("predict.cached")
+def bench_predict_cached(workload):
+    # Timed after the warm up call, so every distinct feature vector is answered from the cache.
+    raw_data = standardize(workload.animals)
+    return partial(predict, raw_data, workload.model_path, cache=PredictionCache())
+
+
+@benchmark("endpoint./predictions/file", max_rows=100_000)
+def bench_endpoint_file(workload):
+    files = {"file": ("animals.csv", workload.animals_csv, "text/csv")}
+    return partial(_post, "/predictions/file", files=files)
+
+
+@benchmark("endpoint./predictions/json-list", max_rows=100_000)
+def bench_endpoint_json_list(workload):
+    payload = {"predictions": _records(workload.animals)}
+    return partial(_post, "/predictions/json-list", json=payload)
+
+
+@benchmark("endpoint./predictions/json", fixed_rows=1)
+def bench_endpoint_json(workload):
+    return partial(_post, "/predictions/json", json=_records(workload.animals)[0])
+
+
+def _records(animals: pd.DataFrame) -> list[dict]:
+    request_fields = list(AnimalPrediction.model_fields)
+    return json.loads(standardize(animals)[request_fields].to_json(orient="records", date_format="iso"))
+
+
+_CLIENT = None
+
+
+def _post(url: str, **kwargs):
+    # Start every request from an empty prediction cache, so repeats time scoring and not cache hits.
+    PREDICTION_CACHE.clear()
+    response = _CLIENT.post(url, **kwargs)
+    response.raise_for_status()
+    return response
+
+
+def _start_client(model_path: Path):
+    global _CLIENT
+    from fastapi.testclient import TestClient
+
+    from animal_shelter.main import app
+
+    # The endpoints read the model path from DefaultPaths, point it at the benchmark model.
+    DefaultPaths.ANIMAL_MODEL_PATH = model_path
+    _CLIENT = TestClient(app).__enter__()
+    # The model is loaded in the background after startup.
+    while _CLIENT.get("/readyz").status_code != 200:
+        time.sleep(0.05)
+
+
+def _train_model(path: Path) -> Path:
+    data = enhancer.add_features(load_data(DefaultPaths.DATA_PATH / "train.csv"), memoize=True)
+    x, y = train_module._split_target(data)
+    pipeline = train_module._build_pipeline().set_params(model__random_state=0)
+    train_module._save_model(train_module._fit_model(pipeline, x, y), path)
+    return path
+
+
+def run_suite(sizes: list[int], keyword: str | None = None, repeat: int = 3) -> list[dict]:
+    cases = [case for case in CASES if keyword is None or keyword in case.name]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="animal_shelter_bench_") as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        model_path = _train_model(tmp_dir / "animal_model.gz")
+        if any(case.name.startswith("endpoint.") for case in cases):
+            _start_client(model_path)
+
+        workloads = {}
+        for case in cases:
+            for rows in case.sizes(sizes):
+                workload = workloads.setdefault(rows, Workload(rows, tmp_dir, model_path))
+                func = case.prepare(workload)
+                func()  # warm up caches, e.g. loading the model
+                seconds = best_of(func, repeat=repeat)
+                results.append({"name": case.name, "rows": rows, "seconds": seconds, "rows_per_second": rows / seconds})
+                print(f"{case.name:<36} {rows:>10,} rows {seconds:>10.4f}s", flush=True)
+
+    if _CLIENT is not None:
+        _CLIENT.__exit__(None, None, None)
+    return results
+
+
+def environment() -> dict:
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def compare(results: list[dict], baseline: dict, threshold: float, min_seconds: float = 0.005) -> pd.DataFrame:
+    """Join the results with the baseline timings.
+
+    A ratio above 1 + threshold is a regression, unless the case got less than
+    min_seconds slower: timings of a few milliseconds vary more than that.
+    """
+    current = pd.DataFrame(results).set_index(["name", "rows"])["seconds"]
+    previous = pd.DataFrame(baseline["results"]).set_index(["name", "rows"])["seconds"]
+    comparison = pd.DataFrame({"seconds": current, "baseline": previous}).dropna()
+    comparison["ratio"] = comparison["seconds"] / comparison["baseline"]
+    difference = comparison["seconds"] - comparison["baseline"]
+    comparison["status"] = np.select(
+        [
+            (comparison["ratio"] > 1 + threshold) & (difference > min_seconds),
+            (comparison["ratio"] < 1 / (1 + threshold)) & (difference < -min_seconds),
+        ],
+        ["REGRESSION", "improved"],
+        "ok",
+    )
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="suite", description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="rows of synthetic data")
+    parser.add_argument("-k", dest="keyword", help="only run cases with this text in their name")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest is kept")
+    parser.add_argument("--output", type=Path, default=BENCHMARKS_PATH / "results.json")
+    parser.add_argument("--baseline", type=Path, default=BENCHMARKS_PATH / "baseline.json")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown against the baseline")
+    parser.add_argument("--min-seconds", type=float, default=0.005,
+                        help="slowdowns of fewer seconds are never regressions")
+    parser.add_argument("--save-baseline", action="store_true", help="also write the results to --baseline")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = {"environment": environment(), "results": run_suite(args.sizes, args.keyword, args.repeat)}
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+
+    comparison = compare(report["results"], json.loads(args.baseline.read_text()), args.threshold, args.min_seconds)
+    print(comparison.to_string(float_format="{:.4f}".format))
+    return int((comparison["status"] == "REGRESSION").any())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
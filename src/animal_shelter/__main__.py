@@ -1,20 +1,110 @@
-from animal_shelter.feature.enhancer import add_features
-from animal_shelter.helper.data_loader import load_data
+import argparse
+from contextlib import nullcontext
+from pathlib import Path
+
+from animal_shelter.feature.store import load_features
+from animal_shelter.helper import instrumentation
+from animal_shelter.model.prediction_cache import PREDICTION_CACHE
+from animal_shelter.model.score import OUTPUT_FORMATS, score_file
+from animal_shelter.model.train import ARTIFACT_FORMATS, INCREMENTAL_ESTIMATORS, train
+from animal_shelter.model.tune import tune
 from animal_shelter.paths import DefaultPaths
 
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="animal_shelter")
+    subparsers = parser.add_subparsers(dest="command")
+
+    score_parser = subparsers.add_parser("score", help="score a CSV file in chunks")
+    score_parser.add_argument("input", type=Path, help="CSV file with animals to score")
+    score_parser.add_argument("output", type=Path, help="file to write the predictions to")
+    score_parser.add_argument("--model", type=Path, default=DefaultPaths.ANIMAL_MODEL_PATH)
+    score_parser.add_argument("--chunk-size", type=int, default=100_000)
+    score_parser.add_argument("--format", choices=OUTPUT_FORMATS, help="defaults to the output file suffix")
+    score_parser.add_argument("--workers", type=int, default=1, help="number of scoring processes")
+    score_parser.add_argument("--profile", action="store_true",
+                              help="report time and memory per stage, stages in worker processes are not covered")
+
+    train_parser = subparsers.add_parser("train", help="train the model and save it")
+    train_parser.add_argument("--data", type=Path, default=DefaultPaths.DATA_PATH / "train.csv")
+    train_parser.add_argument("--model", type=Path, default=DefaultPaths.ANIMAL_MODEL_PATH)
+    train_parser.add_argument("--incremental", action="store_true",
+                              help="add trees fitted on the rows appended since the model was trained")
+    train_parser.add_argument("--new-estimators", type=int, default=INCREMENTAL_ESTIMATORS,
+                              help="trees added by an incremental run")
+    train_parser.add_argument("--artifact-format", choices=list(ARTIFACT_FORMATS), default="joblib",
+                              help="raw and compact formats are uncompressed, compact models are also memory mapped")
+
+    tune_parser = subparsers.add_parser("tune", help="search model options and save the best pipeline")
+    tune_parser.add_argument("--data", type=Path, default=DefaultPaths.DATA_PATH / "train.csv")
+    tune_parser.add_argument("--model", type=Path, default=DefaultPaths.TUNED_MODEL_PATH)
+    tune_parser.add_argument("--results", type=Path, default=DefaultPaths.TUNE_RESULTS_PATH)
+    tune_parser.add_argument("--candidates", type=int, default=30, help="number of sampled parameter combinations")
+    tune_parser.add_argument("--cv", type=int, default=3, help="number of cross-validation folds")
+    tune_parser.add_argument("--jobs", type=int, default=-1, help="parallel fits, -1 uses all cores")
+    tune_parser.add_argument("--cache", action="store_true", help="cache the preprocessing across candidates")
+    tune_parser.add_argument("--seed", type=int)
+
+    args = parser.parse_args(argv)
+    if args.command == "score":
+        score(args)
+    elif args.command == "train":
+        train_model(args)
+    elif args.command == "tune":
+        tune_model(args)
+    else:
+        show_features()
+
+
+def show_features():
     print("----------- Started ----------- ")
 
     csv_file = DefaultPaths.DATA_PATH / "train.csv"
-    animal_outcomes = load_data(csv_file)
-
-    new = add_features(animal_outcomes)
+    new = load_features(csv_file)
     print(new.head().to_string())
     # print(new)
 
     print("----------- Finished -----------")
 
 
+def score(args):
+    print("----------- Started ----------- ")
+
+    with instrumentation.profile() if args.profile else nullcontext() as report:
+        summary = score_file(args.input, args.output, args.model, args.chunk_size, args.format, args.workers)
+    print(f"Scored {summary.rows} rows in {summary.chunks} chunks in {summary.seconds:.2f}s "
+          f"({summary.rows_per_second:,.0f} rows/sec)")
+    if args.workers == 1:
+        cache_stats = PREDICTION_CACHE.stats
+        print(f"Prediction cache hit rate {cache_stats.hit_rate:.1%}, dedup ratio {cache_stats.dedup_ratio:.1%}")
+    if report is not None:
+        print(report.summary().to_string(float_format="{:.3f}".format))
+
+    print("----------- Finished -----------")
+
+
+def train_model(args):
+    print("----------- Started ----------- ")
+
+    model = train(args.data, args.model, incremental=args.incremental, n_new_estimators=args.new_estimators,
+                  artifact_format=args.artifact_format)
+    print(f"Model with {len(model.named_steps['model'].estimators_)} trees "
+          f"trained on {model.trained_rows_} rows saved at {args.model}")
+
+    print("----------- Finished -----------")
+
+
+def tune_model(args):
+    print("----------- Started ----------- ")
+
+    summary = tune(args.data, args.model, args.results, n_candidates=args.candidates, cv=args.cv,
+                   n_jobs=args.jobs, use_cache=args.cache, random_state=args.seed)
+    print(f"Searched {summary.candidates} fits in {summary.seconds:.1f}s, "
+          f"best log loss {-summary.best_score:.4f} with {summary.best_params}")
+    print(f"Best pipeline saved at {args.model}, results at {args.results}")
+
+    print("----------- Finished -----------")
+
+
 if __name__ == "__main__":
     main()
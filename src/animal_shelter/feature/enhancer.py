@@ -1,17 +1,38 @@
 import logging
+import math
+import re
 
 import numpy as np
 import pandas as pd
 
+from animal_shelter.helper.instrumentation import instrumented
+
 LOG = logging.getLogger(__name__)
 
+AGE_PATTERN = r"^(?P<time>\d+)\s+(?P<period>\w+)$"
+PERIOD_MAPPING = {
+    "year": 365,
+    "years": 365,
+    "weeks": 7,
+    "week": 7,
+    "month": 30,
+    "months": 30,
+    "days": 1,
+    "day": 1,
+}
+
 
-def add_features(df):
+@instrumented()
+def add_features(df, memoize=False):
     """Add some feature to our data.
     Parameters
     ----------
     df : pandas.DataFrame
         DataFrame with data (see load_data)
+    memoize : bool
+        Derive the categorical features once per distinct input value and
+        broadcast them back, as pandas.Categorical for the text features,
+        which is much faster on large frames with low-cardinality columns.
     Returns
     -------
     with_features : pandas.DataFrame
@@ -23,17 +44,48 @@ def add_features(df):
     # df['neutered'] = get_neutered(df['sex_upon_outcome'])
     # df['hair_type'] = get_hair_type(df['breed'])
     # df['days_upon_outcome'] = compute_days_upon_outcome(df['age_upon_outcome'])
+    derive = _derive_from_distinct if memoize else _derive
 
     return df.assign(
-        is_dog=check_is_dog(df["animal_type"]),
-        has_name=check_has_name(df["name"]),
-        sex=get_sex(df["sex_upon_outcome"]),
-        neutered=get_neutered(df["sex_upon_outcome"]),
-        hair_type=get_hair_type(df["breed"]),
+        is_dog=derive(check_is_dog, df["animal_type"]),
+        has_name=derive(check_has_name, df["name"]),
+        sex=derive(get_sex, df["sex_upon_outcome"]),
+        neutered=derive(get_neutered, df["sex_upon_outcome"]),
+        hair_type=derive(get_hair_type, df["breed"]),
         days_upon_outcome=compute_days_upon_outcome(df["age_upon_outcome"]),
     )
 
 
+def _derive(feature, column):
+    return feature(column)
+
+
+def _derive_from_distinct(feature, column):
+    """Apply a feature function to the distinct values of a column only.
+    Parameters
+    ----------
+    feature : callable
+        Function mapping a pandas.Series to a derived pandas.Series
+    column : pandas.Series
+        Input column
+    Returns
+    -------
+    derived : pandas.Series
+        Feature aligned with the input column, categorical unless boolean
+    """
+    codes, uniques = pd.factorize(column, use_na_sentinel=False)
+    derived = feature(pd.Series(uniques))
+
+    if pd.api.types.is_bool_dtype(derived):
+        # A categorical of two booleans saves nothing and does not survive Arrow round trips.
+        return pd.Series(derived.array.take(codes), index=column.index, name=column.name)
+
+    derived_codes, categories = pd.factorize(derived)
+    categorical = pd.Categorical.from_codes(derived_codes[codes], categories)
+    return pd.Series(categorical, index=column.index, name=column.name)
+
+
+@instrumented()
 def check_is_dog(animal_type):
     """Check if the animal is a dog, otherwise return False.
     Parameters
@@ -53,6 +105,7 @@ def check_is_dog(animal_type):
     return animal_type.str.lower() == "dog"
 
 
+@instrumented()
 def check_has_name(name):
     """Check if the animal is not called 'unknown'.
     Parameters
@@ -67,6 +120,7 @@ def check_has_name(name):
     return name.str.lower() != "unknown"
 
 
+@instrumented()
 def get_sex(sex_upon_outcome):
     """Determine if the sex was 'Male', 'Female' or unknown.
     Parameters
@@ -86,6 +140,7 @@ def get_sex(sex_upon_outcome):
     return sex
 
 
+@instrumented()
 def get_neutered(sex_upon_outcome):
     """Determine if an animal was intact or not.
     Parameters
@@ -108,6 +163,7 @@ def get_neutered(sex_upon_outcome):
     return neutered
 
 
+@instrumented()
 def get_hair_type(breed):
     """Get hair type of a breed.
     Parameters
@@ -131,6 +187,7 @@ def get_hair_type(breed):
     return hair_type
 
 
+@instrumented()
 def compute_days_upon_outcome(age_upon_outcome):
     """Compute age in days upon outcome.
     Parameters
@@ -142,18 +199,58 @@ def compute_days_upon_outcome(age_upon_outcome):
     days_upon_outcome : pandas.Series
         Age in days
     """
-    split_age = age_upon_outcome.str.split()
-    time = split_age.apply(lambda x: x[0] if x[0] != "Unknown" else np.nan)
-    period = split_age.apply(lambda x: x[1] if x[0] != "Unknown" else None)
-    period_mapping = {
-        "year": 365,
-        "years": 365,
-        "weeks": 7,
-        "week": 7,
-        "month": 30,
-        "months": 30,
-        "days": 1,
-        "day": 1,
-    }
+    # Only a few dozen distinct age strings exist, so parse those once and broadcast back.
+    codes, ages = pd.factorize(age_upon_outcome)
+    parsed = pd.Series(ages).str.extract(AGE_PATTERN)
+    days = parsed["time"].astype(float) * parsed["period"].map(PERIOD_MAPPING)
 
-    return time.astype(float) * period.map(period_mapping)
+    # factorize marks missing values with -1, which picks the trailing NaN.
+    lookup = np.append(days.to_numpy(dtype=float), np.nan)
+    return pd.Series(lookup[codes], index=age_upon_outcome.index, name=age_upon_outcome.name)
+
+
+def derive_record_features(record):
+    """Compute the model features of a single animal without pandas.
+
+    Mirrors the Series based enhancers above for one record, which is much
+    cheaper than building a one-row DataFrame.
+    Parameters
+    ----------
+    record : dict
+        Raw animal fields as in AnimalPrediction
+    Returns
+    -------
+    features : dict
+        Values for DefaultFeatures.CATEGORY_FEATURES and NUM_FEATURES
+    """
+    animal_type = record["animal_type"]
+    if animal_type.lower() not in ("dog", "cat"):
+        raise RuntimeError("Found pets that are not dogs or cats.")
+
+    name = record.get("name")
+    sex_upon_outcome = record["sex_upon_outcome"]
+    if sex_upon_outcome.endswith("Male"):
+        sex = "male"
+    elif sex_upon_outcome.endswith("Female"):
+        sex = "female"
+    else:
+        sex = "unknown"
+
+    # get_hair_type overwrites matches as it goes, so the first matching hair type wins.
+    breed = record["breed"].lower()
+    hair_type = next((hair for hair in ["shorthair", "medium hair", "longhair"] if hair in breed), "unknown")
+
+    age = re.match(AGE_PATTERN, record["age_upon_outcome"])
+    if age is None:
+        days_upon_outcome = math.nan
+    else:
+        days_upon_outcome = float(age["time"]) * PERIOD_MAPPING.get(age["period"], math.nan)
+
+    return {
+        "animal_type": animal_type,
+        "is_dog": animal_type.lower() == "dog",
+        "has_name": not (isinstance(name, str) and name.lower() == "unknown"),
+        "sex": sex,
+        "hair_type": hair_type,
+        "days_upon_outcome": days_upon_outcome,
+    }
@@ -0,0 +1,297 @@
+import hashlib
+import importlib.util
+import inspect
+import json
+import logging
+import os
+import shutil
+import uuid
+from functools import cache
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from animal_shelter.feature import enhancer
+from animal_shelter.helper import data_loader
+from animal_shelter.paths import DefaultPaths
+
+LOG = logging.getLogger(__name__)
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+MANIFEST_NAME = "manifest.json"
+# Feature tables kept per CSV file name, older ones are removed when a new table is written.
+KEEP_FEATURE_TABLES = 3
+# Parts of an incremental feature table, beyond this they are merged into one so reads stay fast.
+MAX_TABLE_PARTS = 32
+
+
+def load_features(
+    csv_path: Path,
+    cache_dir: Path = DefaultPaths.FEATURE_CACHE_PATH,
+    use_cache: bool = True,
+    incremental: bool = False,
+):
+    """Load a CSV file with features added, reusing a cached result when possible.
+
+    The cache is keyed by the content of the CSV file and the source of the
+    loading and feature code, so edits to either invalidate it. Only the
+    KEEP_FEATURE_TABLES most recently used tables per CSV file name are kept,
+    the cache directory can be deleted at any time to drop them all.
+    Parameters
+    ----------
+    csv_path : Path
+        Raw data as accepted by load_data
+    cache_dir : Path
+        Directory holding the cached feature tables
+    use_cache : bool
+        Set to False to always recompute the features
+    incremental : bool
+        Treat the CSV file as append-only and only process rows added since
+        the previous call, see update_feature_table
+    Returns
+    -------
+    with_features : pandas.DataFrame
+        Output of add_features(load_data(csv_path), memoize=True)
+    """
+    if not use_cache:
+        return compute_features(csv_path)
+    if incremental:
+        return update_feature_table(csv_path, cache_dir)
+
+    cache_path = feature_cache_path(csv_path, cache_dir)
+    if cache_path.exists():
+        LOG.info("Reading cached features for %s from %s", csv_path, cache_path)
+        # Mark the table as used, pruning removes the least recently used ones.
+        os.utime(cache_path)
+        return read_table(cache_path)
+
+    with_features = compute_features(csv_path)
+    write_table(with_features, cache_path)
+    LOG.info("Cached features for %s at %s", csv_path, cache_path)
+    prune_feature_tables(csv_path, cache_dir, KEEP_FEATURE_TABLES)
+
+    return with_features
+
+
+def update_feature_table(csv_path: Path, cache_dir: Path = DefaultPaths.FEATURE_CACHE_PATH) -> pd.DataFrame:
+    """Bring the feature table of an append-only CSV file up to date.
+
+    Only the complete lines appended since the previous call are parsed and
+    stored as a new part of the table. A checksum of the already processed
+    prefix detects files that were rewritten instead of appended to, in which
+    case the table is rebuilt. A trailing line without newline is considered
+    still being written and is picked up by a later call. Tables of the same
+    CSV file built by other versions of the feature code are removed, and
+    the parts are merged into one once there are more than MAX_TABLE_PARTS.
+    Parameters
+    ----------
+    csv_path : Path
+        Raw data as accepted by load_data
+    cache_dir : Path
+        Directory holding the cached feature tables
+    Returns
+    -------
+    with_features : pandas.DataFrame
+        Output of add_features(load_data(csv_path), memoize=True)
+    """
+    table_dir = feature_table_dir(csv_path, cache_dir)
+    manifest = read_manifest(table_dir)
+
+    with open(csv_path, "rb") as csv_file:
+        prefix_digest = hashlib.sha256()
+        if manifest is not None and not _prefix_matches(csv_file, manifest, prefix_digest):
+            LOG.warning("%s was rewritten, rebuilding its feature table", csv_path)
+            manifest = None
+        if manifest is None:
+            shutil.rmtree(table_dir, ignore_errors=True)
+            for stale_dir in table_dir.parent.glob(f"{Path(csv_path).stem}-{_source_hash(csv_path)}-incremental-*"):
+                LOG.info("Removing feature table %s of other feature code", stale_dir)
+                shutil.rmtree(stale_dir, ignore_errors=True)
+            # A new id per build tells readers of the table that its rows were replaced, not appended to.
+            manifest = {"id": uuid.uuid4().hex, "bytes": 0, "rows": 0, "header": None, "parts": [], "next_part": 0}
+            prefix_digest = hashlib.sha256()
+
+        csv_file.seek(manifest["bytes"])
+        tail = csv_file.read()
+
+    complete = tail[:tail.rfind(b"\n") + 1]
+    if complete:
+        prefix_digest.update(complete)
+        _append_part(table_dir, manifest, complete)
+        manifest["bytes"] += len(complete)
+        manifest["prefix_sha256"] = prefix_digest.hexdigest()
+        write_manifest(table_dir, manifest)
+
+    with_features = _concat_tables([read_table(table_dir / part) for part in manifest["parts"]])
+    if len(manifest["parts"]) > MAX_TABLE_PARTS:
+        _compact_parts(table_dir, manifest, with_features)
+
+    return with_features
+
+
+def prune_feature_tables(
+    csv_path: Path, cache_dir: Path = DefaultPaths.FEATURE_CACHE_PATH, keep: int = KEEP_FEATURE_TABLES
+) -> list[Path]:
+    """Remove all but the most recently used cached feature tables of files named like csv_path.
+    Parameters
+    ----------
+    csv_path : Path
+        CSV file whose tables are pruned, tables of every file with its name count
+    cache_dir : Path
+        Directory holding the cached feature tables
+    keep : int
+        Number of tables to keep
+    Returns
+    -------
+    removed : list of Path
+        The removed tables
+    """
+    # Content hashes are 16 hex digits, which keeps tables of the incremental store and of other names out.
+    tables = Path(cache_dir).glob(f"{Path(csv_path).stem}-{'?' * 16}{table_suffix()}")
+    by_last_use = sorted(tables, key=lambda table: table.stat().st_mtime_ns, reverse=True)
+    for table in by_last_use[keep:]:
+        LOG.info("Removing cached feature table %s", table)
+        table.unlink(missing_ok=True)
+
+    return by_last_use[keep:]
+
+
+def feature_table_dir(csv_path: Path, cache_dir: Path = DefaultPaths.FEATURE_CACHE_PATH) -> Path:
+    # Keyed by the full path, files with the same name in different directories get their own table.
+    return Path(cache_dir) / f"{Path(csv_path).stem}-{_source_hash(csv_path)}-incremental-{code_version()[:16]}"
+
+
+def _source_hash(csv_path: Path) -> str:
+    return hashlib.sha256(str(Path(csv_path).resolve()).encode()).hexdigest()[:8]
+
+
+def feature_table_id(csv_path: Path, cache_dir: Path = DefaultPaths.FEATURE_CACHE_PATH) -> str | None:
+    """Id of the current build of the feature table of csv_path, None when there is none.
+
+    The id stays the same while rows are appended and changes when the table is rebuilt.
+    """
+    manifest = read_manifest(feature_table_dir(csv_path, cache_dir))
+    return None if manifest is None else manifest.get("id")
+
+
+def read_manifest(table_dir: Path) -> dict | None:
+    manifest_path = table_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+    return json.loads(manifest_path.read_text())
+
+
+def write_manifest(table_dir: Path, manifest: dict) -> None:
+    manifest_path = table_dir / MANIFEST_NAME
+    tmp_path = manifest_path.with_name(f".{MANIFEST_NAME}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, manifest_path)
+
+
+def _prefix_matches(csv_file, manifest: dict, digest) -> bool:
+    remaining = manifest["bytes"]
+    while remaining:
+        block = csv_file.read(min(remaining, 1 << 20))
+        if not block:
+            return False
+        digest.update(block)
+        remaining -= len(block)
+
+    return digest.hexdigest() == manifest.get("prefix_sha256")
+
+
+def _append_part(table_dir: Path, manifest: dict, lines: bytes) -> None:
+    if manifest["header"] is None:
+        header, _, lines = lines.partition(b"\n")
+        manifest["header"] = header.decode()
+    if not lines:
+        return
+
+    header = f"{manifest['header']}\n".encode()
+    with_features = enhancer.add_features(data_loader.load_data(BytesIO(header + lines)), memoize=True)
+
+    part = _next_part_name(manifest)
+    write_table(with_features, table_dir / part)
+    manifest["parts"].append(part)
+    manifest["rows"] += len(with_features)
+    LOG.info("Added %d rows to the feature table in %s", len(with_features), table_dir)
+
+
+def _compact_parts(table_dir: Path, manifest: dict, with_features: pd.DataFrame) -> None:
+    old_parts = manifest["parts"]
+    part = _next_part_name(manifest)
+    write_table(with_features, table_dir / part)
+    manifest["parts"] = [part]
+    write_manifest(table_dir, manifest)
+    # Only unlink after the new manifest is in place, so the table stays readable throughout.
+    for old_part in old_parts:
+        (table_dir / old_part).unlink(missing_ok=True)
+    LOG.info("Merged %d parts of the feature table in %s", len(old_parts), table_dir)
+
+
+def _next_part_name(manifest: dict) -> str:
+    # Names are never reused, a merged part must not overwrite one it replaces.
+    part = f"part-{manifest['next_part']:05d}{table_suffix()}"
+    manifest["next_part"] += 1
+    return part
+
+
+def _concat_tables(tables: list[pd.DataFrame]) -> pd.DataFrame:
+    if not tables:
+        return pd.DataFrame()
+
+    # Parts have their own categories, align them so the columns stay categorical.
+    for column in tables[0].columns:
+        if all(isinstance(table[column].dtype, pd.CategoricalDtype) for table in tables):
+            categories = union_categoricals([table[column] for table in tables]).categories
+            for table in tables:
+                table[column] = table[column].cat.set_categories(categories)
+
+    return pd.concat(tables, ignore_index=True)
+
+
+def compute_features(csv_path: Path) -> pd.DataFrame:
+    return enhancer.add_features(data_loader.load_data(csv_path), memoize=True)
+
+
+def feature_cache_path(csv_path: Path, cache_dir: Path = DefaultPaths.FEATURE_CACHE_PATH) -> Path:
+    digest = hashlib.sha256(code_version().encode())
+    with open(csv_path, "rb") as csv_file:
+        for block in iter(lambda: csv_file.read(1 << 20), b""):
+            digest.update(block)
+
+    return Path(cache_dir) / f"{Path(csv_path).stem}-{digest.hexdigest()[:16]}{table_suffix()}"
+
+
+@cache
+def code_version() -> str:
+    """Hash of the code that turns raw CSV data into features."""
+    source = "".join(inspect.getsource(module) for module in (data_loader, enhancer))
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def table_suffix() -> str:
+    # Arrow IPC when pyarrow is installed, pickle otherwise.
+    return ".arrow" if HAS_PYARROW else ".pkl"
+
+
+def read_table(path: Path) -> pd.DataFrame:
+    if path.suffix == ".arrow":
+        from pyarrow import feather
+
+        return feather.read_table(path, memory_map=True).to_pandas()
+    return pd.read_pickle(path)
+
+
+def write_table(df: pd.DataFrame, path: Path) -> None:
+    """Write atomically, so concurrent runs never read a partial table."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    if path.suffix == ".arrow":
+        df.to_feather(tmp_path)
+    else:
+        df.to_pickle(tmp_path)
+
+    os.replace(tmp_path, path)
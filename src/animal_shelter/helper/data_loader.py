@@ -4,38 +4,86 @@ import re
 
 from pathlib import Path
 
+from animal_shelter.helper.instrumentation import instrumented
+
 LOG = logging.getLogger(__name__)
 
 
-def load_data(file_path: Path):
+class DefaultSchema:
+    DATE_COLUMNS = ["DateTime"]
+
+    CATEGORY_COLUMNS = [
+        "OutcomeType",
+        "OutcomeSubtype",
+        "AnimalType",
+        "SexuponOutcome",
+        "AgeuponOutcome",
+        "Breed",
+        "Color",
+    ]
+
+    STRING_COLUMNS = ["AnimalID", "Name"]
+
+
+@instrumented()
+def load_data(file_path: Path, typed: bool = False, engine: str | None = None):
     """Load the data and convert the column names.
 
     Parameters
     ----------
     file_path : Path
         Path to data relative to the PROJECT path
+    typed : bool
+        Read the low-cardinality text columns of DefaultSchema as category
+        instead of Python strings
+    engine : str, optional
+        Parser engine for pandas.read_csv. With "pyarrow" the typed path also
+        stores the remaining text columns with the pyarrow string dtype.
     Returns
     -------
     df : pandas.DataFrame
         DataFrame with data
     """
     LOG.debug(f"Loading data from {file_path}")
-    df = standardize(pd.read_csv(file_path, parse_dates=["DateTime"]))
+    dtype = schema_dtypes(engine) if typed else None
+    df = standardize(pd.read_csv(file_path, parse_dates=DefaultSchema.DATE_COLUMNS, dtype=dtype, engine=engine))
 
     return df
 
 
+def schema_dtypes(engine: str | None = None) -> dict:
+    """Column dtypes for a typed read of the raw shelter data.
+
+    Columns missing from a file are ignored by pandas.read_csv.
+    """
+    dtypes = {column: "category" for column in DefaultSchema.CATEGORY_COLUMNS}
+    if engine == "pyarrow":
+        dtypes.update({column: "string[pyarrow]" for column in DefaultSchema.STRING_COLUMNS})
+
+    return dtypes
+
+
 def convert_camel_case(name):
     """Convert camelCaseString to snake_case_string."""
     s1 = re.sub("(.)([A-Z][a-z]+)", r"\1_\2", name)
     return re.sub("([a-z0-9])([A-Z])", r"\1_\2", s1).lower()
 
 
+@instrumented()
 def standardize(df: pd.DataFrame) -> pd.DataFrame:
-    return (
-        df
-        .assign(date=lambda d: pd.to_datetime(d['DateTime']).dt.normalize())
-        .rename(columns=lambda x: x.replace("upon", "Upon"))
-        .rename(columns=convert_camel_case)
-        .fillna("Unknown")
-    )
+    # assign is the only copy of the input, everything below updates that copy in place.
+    standardized = df.assign(date=lambda d: pd.to_datetime(d['DateTime']).dt.normalize())
+    standardized.columns = [convert_camel_case(column.replace("upon", "Upon")) for column in standardized.columns]
+
+    for column in standardized.columns[standardized.isna().any()]:
+        standardized[column] = fill_missing(standardized[column], "Unknown")
+
+    return standardized
+
+
+def fill_missing(column: pd.Series, value: str) -> pd.Series:
+    """Fill missing values of a single column, keeping categorical columns categorical."""
+    if isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories:
+        column = column.cat.add_categories(value)
+
+    return column.fillna(value)
@@ -0,0 +1,186 @@
+import functools
+import logging
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+import pandas as pd
+
+from animal_shelter.settings import DefaultSettings
+
+LOG = logging.getLogger(__name__)
+
+
+@dataclass
+class StageRecord:
+    """Timing and memory of one call of an instrumented stage."""
+    name: str
+    depth: int
+    seconds: float = 0.0
+    rows: int | None = None
+    peak_bytes: int | None = None
+    # Absolute traced memory, used while the stage is running.
+    _start_bytes: int = field(default=0, repr=False)
+    _peak_seen: int = field(default=0, repr=False)
+
+
+class Report:
+    """Stages recorded while instrumentation was enabled, in the order they finished.
+
+    Only the most recent ``max_records`` stages are kept, so a long running
+    process with instrumentation switched on does not grow without bound.
+    """
+
+    def __init__(self, max_records: int = 100_000):
+        self.records: deque[StageRecord] = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def add(self, record: StageRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def as_dicts(self) -> list[dict]:
+        return [
+            {key: value for key, value in asdict(record).items() if not key.startswith("_")}
+            for record in self.records
+        ]
+
+    def summary(self) -> pd.DataFrame:
+        """Calls, total time, rows and the largest peak per stage, slowest stage first."""
+        records = pd.DataFrame(self.as_dicts(), columns=["name", "depth", "seconds", "rows", "peak_bytes"])
+        records = records.astype({"rows": "Int64", "peak_bytes": "Int64"})
+        grouped = records.groupby("name")
+        summary = pd.DataFrame({
+            "calls": grouped.size(),
+            "seconds": grouped["seconds"].sum(),
+            "rows": grouped["rows"].sum(min_count=1),
+            "peak_mib": grouped["peak_bytes"].max() / 2**20,
+        })
+        return summary.sort_values("seconds", ascending=False)
+
+
+class _State:
+    # Enabled through the environment, peak memory is only reported when tracemalloc
+    # is tracing already, e.g. with PYTHONTRACEMALLOC=1.
+    enabled = DefaultSettings.INSTRUMENTATION
+    track_memory = True
+    # Whether enable() started tracemalloc, tracing started by anyone else is left running.
+    started_tracing = False
+    report = Report()
+    local = threading.local()
+
+
+def enable(track_memory: bool = True) -> Report:
+    """Start recording instrumented stages into a new report.
+    :param track_memory: trace allocations to report peak memory, this slows down allocation heavy code
+    :return: the report the stages are recorded into
+    """
+    _State.report = Report()
+    _State.track_memory = track_memory
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _State.started_tracing = True
+    _State.enabled = True
+    return _State.report
+
+
+def disable() -> Report:
+    """Stop recording and return the report collected since enable()."""
+    _State.enabled = False
+    if _State.started_tracing:
+        tracemalloc.stop()
+        _State.started_tracing = False
+    return _State.report
+
+
+def is_enabled() -> bool:
+    return _State.enabled
+
+
+@contextmanager
+def profile(track_memory: bool = True):
+    """Record the instrumented stages run inside the block.
+
+    Peak memory is exact for single-threaded code; concurrent threads share the
+    tracemalloc peak, so their stages may report each other's allocations.
+    """
+    report = enable(track_memory)
+    try:
+        yield report
+    finally:
+        disable()
+        for _, row in report.summary().iterrows():
+            LOG.info("%s: %d call(s), %.1fms, %s rows, peak %.1f MiB",
+                     row.name, row["calls"], row["seconds"] * 1000, row["rows"], row["peak_mib"])
+
+
+@contextmanager
+def stage(name: str, rows: int | None = None):
+    """Time a block as a stage of the report; does nothing while instrumentation is disabled."""
+    if not _State.enabled:
+        yield None
+        return
+
+    stack = _stack()
+    record = StageRecord(name, depth=len(stack), rows=rows)
+    if _State.track_memory and tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        # Credit the peak so far to the enclosing stages before restarting peak tracking.
+        for parent in stack:
+            parent._peak_seen = max(parent._peak_seen, peak)
+        tracemalloc.reset_peak()
+        record._start_bytes = record._peak_seen = current
+
+    stack.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        stack.pop()
+        if _State.track_memory and tracemalloc.is_tracing():
+            record._peak_seen = max(record._peak_seen, tracemalloc.get_traced_memory()[1])
+            record.peak_bytes = record._peak_seen - record._start_bytes
+            if stack:
+                stack[-1]._peak_seen = max(stack[-1]._peak_seen, record._peak_seen)
+
+        _State.report.add(record)
+        LOG.debug("%s%s took %.1fms for %s rows", "  " * record.depth, name, record.seconds * 1000, record.rows)
+
+
+def instrumented(name: str | None = None):
+    """Decorator recording each call of a function as a stage.
+
+    The number of rows is taken from the length of the returned frame, series
+    or array. While instrumentation is disabled the wrapper only checks a flag.
+    """
+    def decorate(func):
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _State.enabled:
+                return func(*args, **kwargs)
+
+            with stage(stage_name) as record:
+                result = func(*args, **kwargs)
+                record.rows = _count_rows(result)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+def _stack() -> list[StageRecord]:
+    if not hasattr(_State.local, "stack"):
+        _State.local.stack = []
+    return _State.local.stack
+
+
+def _count_rows(result) -> int | None:
+    shape = getattr(result, "shape", None)
+    return shape[0] if shape else None
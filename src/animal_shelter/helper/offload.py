@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+LOG = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the executor already has the maximum number of tasks queued."""
+
+
+class BoundedExecutor:
+    """Thread pool for CPU-bound work called from the event loop.
+
+    At most ``workers + queue_size`` tasks are accepted at a time, further
+    submissions fail fast with QueueFullError instead of piling up.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="prediction")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    async def run(self, func, *args):
+        """Run func(*args) in the pool and wait for its result without blocking the event loop."""
+        self._acquire()
+
+        try:
+            future = self._executor.submit(self._run_and_release, func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        return await asyncio.wrap_future(future)
+
+    def lease(self) -> "Lease":
+        """Take one slot for a series of calls, failing fast with QueueFullError like run.
+
+        Calls through the lease never fail for lack of a slot, so work that has
+        already started answering, like a streamed response, can finish. The
+        slot is freed by Lease.release.
+        """
+        self._acquire()
+        return Lease(self._executor, self._slots)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _acquire(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("Too many predictions in progress")
+
+    def _run_and_release(self, func, *args):
+        # Released in the worker so a cancelled request keeps its slot until the work is done.
+        try:
+            return func(*args)
+        finally:
+            self._slots.release()
+
+
+class Lease:
+    """A slot of a BoundedExecutor held for calls that run one after the other."""
+
+    def __init__(self, executor: ThreadPoolExecutor, slots: threading.BoundedSemaphore):
+        self._executor = executor
+        self._slots = slots
+        self._last: Future | None = None
+        self._released = False
+
+    async def run(self, func, *args):
+        """Run func(*args) in the pool on the leased slot and wait for its result."""
+        if self._released:
+            raise RuntimeError("The lease was released")
+        self._last = self._executor.submit(func, *args)
+        return await asyncio.wrap_future(self._last)
+
+    def release(self, cleanup: Callable[[], None] | None = None) -> None:
+        """Free the slot, once the last call is done when it is still running.
+        :param cleanup: called before the slot is freed, e.g. to close what the calls worked on
+        """
+        if self._released:
+            return
+        self._released = True
+
+        def finish(_=None):
+            try:
+                if cleanup is not None:
+                    cleanup()
+            finally:
+                self._slots.release()
+
+        if self._last is None:
+            finish()
+        else:
+            # Like BoundedExecutor.run, a cancelled caller keeps the slot until the work is done.
+            self._last.add_done_callback(finish)
@@ -0,0 +1,80 @@
+import importlib.util
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+LOG = logging.getLogger(__name__)
+
+HAS_ORJSON = importlib.util.find_spec("orjson") is not None
+LAYOUTS = ["records", "columns"]
+
+
+def frame_to_json(df: pd.DataFrame, layout: str = "records") -> bytes:
+    """Encode a DataFrame as JSON bytes, without FastAPI's jsonable_encoder.
+
+    Uses orjson when it is installed and the json module otherwise, floats
+    keep their full precision either way.
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Frame to encode, e.g. predictions
+    layout : str
+        records for a list with one object per row, columns for one object
+        with a list of values per column
+    Returns
+    -------
+    encoded : bytes
+        UTF-8 encoded JSON document
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout {layout!r}, expected one of {LAYOUTS}")
+
+    if layout == "columns" and HAS_ORJSON:
+        import orjson
+
+        columns = {str(name): _orjson_column(column) for name, column in df.items()}
+        return orjson.dumps(columns, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    columns = {str(name): column.tolist() for name, column in df.items()}
+    if layout == "records":
+        return _dumps(_records(columns))
+    return _dumps(columns)
+
+
+def frame_to_json_lines(df: pd.DataFrame) -> bytes:
+    """Encode a DataFrame as newline delimited JSON, one object per row.
+
+    Floats are encoded like frame_to_json, so both give the same values.
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Frame to encode, e.g. predictions
+    Returns
+    -------
+    encoded : bytes
+        UTF-8 encoded lines, each ending with a newline
+    """
+    columns = {str(name): column.tolist() for name, column in df.items()}
+    return b"".join(_dumps(record) + b"\n" for record in _records(columns))
+
+
+def _records(columns: dict[str, list]) -> list[dict]:
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def _dumps(document) -> bytes:
+    if HAS_ORJSON:
+        import orjson
+
+        return orjson.dumps(document)
+    return json.dumps(document, separators=(",", ":")).encode()
+
+
+def _orjson_column(column: pd.Series):
+    # orjson serializes contiguous numeric arrays natively, anything else goes through Python objects.
+    if column.dtype.kind in "biuf" and not isinstance(column.dtype, pd.api.extensions.ExtensionDtype):
+        return np.ascontiguousarray(column.to_numpy())
+    return column.tolist()
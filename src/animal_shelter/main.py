@@ -1,53 +1,449 @@
+import asyncio
+import functools
+import importlib
 import logging
+import shutil
+import tempfile
+import time
+from collections.abc import Iterable, Iterator
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Literal
 
-from fastapi import FastAPI, UploadFile
+from fastapi import Depends, FastAPI, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from animal_shelter.helper.data_loader import load_data
-from animal_shelter.model.domain import ListAnimalPrediction, AnimalPrediction
-from animal_shelter.model.predict import predict_file as pf, predict_json as pj, predict_json_list as pjl
-from animal_shelter.model.train import train
+from animal_shelter.helper.metrics import CONTENT_TYPE, METRICS, SIZE_BUCKETS
+from animal_shelter.helper.offload import BoundedExecutor, QueueFullError
+from animal_shelter.model.batcher import MicroBatcher
+from animal_shelter.model.domain import ColumnarAnimalPrediction, ListAnimalPrediction, AnimalPrediction
 from animal_shelter.paths import DefaultPaths
+from animal_shelter.settings import DefaultSettings
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Modules pulling in pandas, scikit-learn and joblib. They are imported by the endpoints
+# that need them, and ahead of the first request by the background model preparation,
+# so importing the app and starting the server stays fast.
+PREDICTION_MODULES = [
+    "animal_shelter.helper.data_loader",
+    "animal_shelter.helper.serialization",
+    "animal_shelter.model.fast_predict",
+    "animal_shelter.model.holder",
+    "animal_shelter.model.predict",
+    "animal_shelter.model.score",
+    "animal_shelter.model.tables",
+    "animal_shelter.model.warm_up",
+]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    if ~Path.exists(DefaultPaths.ANIMAL_MODEL_PATH):
-        train(DefaultPaths.DATA_PATH / "train.csv", DefaultPaths.ANIMAL_MODEL_PATH)
-        LOG.info("model trained and saved")  # not working :P
-
+    app.state.model_status = "loading"
+    app.state.model_holder = None
+    app.state.executor = BoundedExecutor(DefaultSettings.PREDICTION_WORKERS, DefaultSettings.PREDICTION_QUEUE_SIZE)
+    app.state.batcher = MicroBatcher(
+        functools.partial(_predict_micro_batch, app),
+        max_batch_size=DefaultSettings.MICRO_BATCH_MAX_SIZE,
+        max_wait=DefaultSettings.MICRO_BATCH_MAX_WAIT_MS / 1000,
+        run=app.state.executor.run,
+    )
+    app.state.batcher.start()
+    # Serve right away, /readyz reports when the model can be used.
+    app.state.model_task = asyncio.create_task(_prepare_model(app, DefaultPaths.ANIMAL_MODEL_PATH))
     yield
-    LOG.info("do nothing")
+    app.state.model_task.cancel()
+    if app.state.model_holder is not None:
+        app.state.model_holder.stop()
+    await app.state.batcher.stop()
+    LOG.info("micro-batching stats: %s", app.state.batcher.stats())
+    app.state.executor.shutdown()
+
+
+async def _prepare_model(app: FastAPI, model_path: Path) -> None:
+    """Import the prediction code, train a model when none is saved yet, load and warm it up, off the event loop.
+
+    Afterwards the model holder keeps checking the model file and swaps in newly published versions.
+    """
+    try:
+        await asyncio.to_thread(_load_or_train_model, app, model_path)
+    except Exception as exc:
+        LOG.exception("Preparing the model at %s failed", model_path)
+        app.state.model_status = f"failed: {exc}"
+        return
+
+    app.state.model_status = "ready"
+    LOG.info("Model at %s is ready", model_path)
+
+
+def _load_or_train_model(app: FastAPI, model_path: Path) -> None:
+    for module in PREDICTION_MODULES:
+        importlib.import_module(module)
+
+    from animal_shelter.model.holder import ModelHolder
+    from animal_shelter.model.registry import MODEL_REGISTRY
+    from animal_shelter.model.train import train
+
+    if not Path(model_path).exists():
+        app.state.model_status = "training"
+        LOG.info("No model at %s, training one", model_path)
+        train(DefaultPaths.DATA_PATH / "train.csv", model_path)
+        LOG.info("Model trained and saved at %s", model_path)
+
+    app.state.model_status = "warming up"
+    holder = ModelHolder(
+        model_path, DefaultSettings.WARM_UP_ROWS, DefaultSettings.PREDICTION_ENGINE,
+        DefaultSettings.MODEL_RELOAD_INTERVAL,
+    )
+    holder.load()
+    _register_model_metrics(MODEL_REGISTRY, holder)
+    app.state.model_holder = holder
+    holder.start()
+
+
+def _require_model(request: Request):
+    """Dependency of the prediction endpoints returning the current model, 503 until there is one.
+
+    Endpoints use the returned model for the whole request, so a reload never mixes versions.
+    """
+    status = request.app.state.model_status
+    if status != "ready":
+        raise HTTPException(status_code=503, detail=f"Model is not ready: {status}", headers={"Retry-After": "1"})
+    return request.app.state.model_holder.current
 
 
 app = FastAPI(lifespan=lifespan)
 LOG = logging.getLogger(__name__)
 
+# records: one object per animal, columns: one list per field.
+Layout = Literal["records", "columns"]
+
+REQUESTS = METRICS.counter(
+    "animal_shelter_http_requests_total", "HTTP requests by method, route and status", ["method", "route", "status"]
+)
+REQUEST_LATENCY = METRICS.histogram(
+    "animal_shelter_http_request_duration_seconds", "HTTP request latency by method and route", ["method", "route"]
+)
+IN_FLIGHT = METRICS.gauge("animal_shelter_http_requests_in_flight", "HTTP requests being processed")
+BATCH_SIZE = METRICS.histogram(
+    "animal_shelter_prediction_batch_size", "Animals scored per model call by route", ["route"], SIZE_BUCKETS
+)
+# Response header naming the model version that produced the predictions.
+MODEL_VERSION_HEADER = "X-Model-Version"
+# Bytes of an upload kept in memory by /predictions/file before it spills to disk, like Starlette's form parser.
+UPLOAD_SPOOL_BYTES = 1024 * 1024
+
+
+def _predict_micro_batch(app: FastAPI, animals: list[AnimalPrediction]):
+    from animal_shelter.model.fast_predict import predict_micro_batch
+
+    BATCH_SIZE.observe(len(animals), route="/predictions/json")
+    model = app.state.model_holder.current
+    predictions = predict_micro_batch(animals, model.pipeline, DefaultSettings.PREDICTION_ENGINE)
+    # The rows handed back to each request keep the attrs, and with them the version.
+    predictions.attrs["model_version"] = model.version
+    return predictions
+
+
+def _register_model_metrics(registry, holder) -> None:
+    from animal_shelter.model.prediction_cache import PREDICTION_CACHE
+
+    def registry_samples(name: str, field: str):
+        return lambda: [(name, {}, getattr(registry.stats, field))]
+
+    def warm_up_samples(name: str, field: str):
+        return lambda: [(name, {}, getattr(holder.current.warm_up, field))]
+
+    METRICS.collector(
+        "animal_shelter_model_cache_lookups_total", "Model registry lookups by result", "counter",
+        lambda: [
+            ("animal_shelter_model_cache_lookups_total", {"result": "hit"}, registry.stats.hits),
+            ("animal_shelter_model_cache_lookups_total", {"result": "miss"}, registry.stats.misses),
+        ],
+    )
+    METRICS.collector(
+        "animal_shelter_model_loads_total", "Models deserialized from disk", "counter",
+        registry_samples("animal_shelter_model_loads_total", "loads"),
+    )
+    METRICS.collector(
+        "animal_shelter_model_load_seconds_total", "Time spent deserializing models", "counter",
+        registry_samples("animal_shelter_model_load_seconds_total", "load_seconds"),
+    )
+    METRICS.collector(
+        "animal_shelter_model_info", "Version of the model serving predictions", "gauge",
+        lambda: [("animal_shelter_model_info", {"version": holder.current.version}, 1)],
+    )
+    METRICS.collector(
+        "animal_shelter_model_reloads_total", "Attempts to swap in a newly published model by result", "counter",
+        lambda: [
+            ("animal_shelter_model_reloads_total", {"result": "success"}, holder.stats.reloads),
+            ("animal_shelter_model_reloads_total", {"result": "failure"}, holder.stats.failures),
+        ],
+    )
+    METRICS.collector(
+        "animal_shelter_model_warm_up_seconds", "Time spent loading and warming up the current model", "gauge",
+        warm_up_samples("animal_shelter_model_warm_up_seconds", "seconds"),
+    )
+    METRICS.collector(
+        "animal_shelter_model_warm_up_rows", "Synthetic animals scored to warm up the current model", "gauge",
+        warm_up_samples("animal_shelter_model_warm_up_rows", "rows"),
+    )
+    METRICS.collector(
+        "animal_shelter_prediction_cache_lookups_total", "Prediction cache lookups of distinct feature vectors",
+        "counter",
+        lambda: [
+            ("animal_shelter_prediction_cache_lookups_total", {"result": "hit"}, PREDICTION_CACHE.stats.hits),
+            ("animal_shelter_prediction_cache_lookups_total", {"result": "miss"}, PREDICTION_CACHE.stats.misses),
+        ],
+    )
+    METRICS.collector(
+        "animal_shelter_prediction_cache_hit_rate", "Share of distinct feature vectors answered from the cache", "gauge",
+        lambda: [("animal_shelter_prediction_cache_hit_rate", {}, PREDICTION_CACHE.stats.hit_rate)],
+    )
+    METRICS.collector(
+        "animal_shelter_prediction_dedup_ratio", "Share of scored rows that duplicated another row of their batch",
+        "gauge",
+        lambda: [("animal_shelter_prediction_dedup_ratio", {}, PREDICTION_CACHE.stats.dedup_ratio)],
+    )
+    METRICS.collector(
+        "animal_shelter_prediction_cache_entries", "Feature vectors in the prediction cache", "gauge",
+        lambda: [("animal_shelter_prediction_cache_entries", {}, len(PREDICTION_CACHE))],
+    )
+
+
+class RequestMetricsMiddleware:
+    """Count HTTP requests and record their latency once the last part of the body is sent.
+
+    A streamed response sends its headers long before it is done, so the
+    latency histogram and the in-flight gauge cover the whole body. The
+    X-Process-Time header goes out with the headers and therefore reports the
+    time until the response started.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        status = 500
+        recorded = False
+
+        def record() -> None:
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            # Label by route template so path parameters and unknown paths do not create new series.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUESTS.inc(method=scope["method"], route=route, status=status)
+            REQUEST_LATENCY.observe(elapsed, method=scope["method"], route=route)
+            LOG.info("%s %s took %.1fms", scope["method"], scope["path"], elapsed * 1000)
+
+        async def send_and_record(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("X-Process-Time", f"{time.perf_counter() - start:.6f}")
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            record()
+
+
+app.add_middleware(RequestMetricsMiddleware)
+
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
 
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process serves requests, whether or not the model is ready."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz(request: Request):
+    """Readiness: 200 once the model is loaded and warmed up, 503 before that.
+
+    The response reports the model version, the warm-up batch size and how long each warm-up step took.
+    """
+    status = request.app.state.model_status
+    content = {"status": status}
+    if status == "ready":
+        model = request.app.state.model_holder.current
+        content.update(model_version=model.version, warm_up=model.warm_up.as_dict())
+    return JSONResponse(status_code=200 if status == "ready" else 503, content=content)
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(METRICS.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/animals/train-data")
-async def animals_file_head(limit: int = 5):
+async def animals_file_head(request: Request, limit: int = 5):
+    from animal_shelter.helper.data_loader import load_data
+
     LOG.info("calling /animals/train-data")
     csv_file = DefaultPaths.DATA_PATH / "train.csv"
-    return load_data(csv_file).head(limit)
+    return (await request.app.state.executor.run(load_data, csv_file)).head(limit)
 
 
 @app.post("/predictions/file")
-async def create_upload_file(file: UploadFile):
-    data = await file.read()
-    return pf(data, DefaultPaths.ANIMAL_MODEL_PATH).to_dict(orient="records")
+async def create_upload_file(request: Request, file: UploadFile, format: str = "json", model=Depends(_require_model)):
+    """Score an uploaded CSV file chunk by chunk, streaming the predictions back.
+
+    The upload is copied to a spooled temporary file owned by the response,
+    since FastAPI closes the uploaded file once the endpoint returns, and read
+    from there in chunks of UPLOAD_CHUNK_ROWS rows. Each chunk is scored and
+    sent before the next one is parsed, so memory stays bounded by the chunk
+    size. Errors in the first chunk fail the request, later errors end the
+    stream early. The stream holds one executor slot from the copy of the
+    upload to its last chunk, so a busy pool rejects the upload with a 503
+    before the response starts instead of cutting it off halfway.
+    """
+    from animal_shelter.model.score import STREAM_MEDIA_TYPES, encode_chunks, read_chunks, score_chunks
+
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=422, detail=f"format must be one of {list(STREAM_MEDIA_TYPES)}")
+
+    lease = request.app.state.executor.lease()
+    try:
+        upload = await lease.run(_copy_upload, file.file)
+    except BaseException:
+        lease.release()
+        raise
+    chunks = read_chunks(upload, DefaultSettings.UPLOAD_CHUNK_ROWS)
+    predictions = score_chunks(chunks, model.pipeline, DefaultSettings.PREDICTION_ENGINE)
+    pieces = encode_chunks(_observe_batch_sizes(predictions, "/predictions/file"), format)
+
+    def close():
+        def cleanup():
+            chunks.close()
+            upload.close()
+
+        lease.release(cleanup)
 
+    # Score the first chunk before answering, so invalid uploads still get an error status.
+    try:
+        first = await lease.run(next, pieces, b"")
+    except BaseException:
+        close()
+        raise
 
-@app.post("/predictions/json")
-async def predict_json(pred_data: AnimalPrediction):
-    return pj(pred_data, DefaultPaths.ANIMAL_MODEL_PATH).to_dict(orient="records")
+    async def stream():
+        try:
+            yield first
+            while (piece := await lease.run(next, pieces, None)) is not None:
+                yield piece
+        finally:
+            close()
+
+    return StreamingResponse(
+        stream(), media_type=STREAM_MEDIA_TYPES[format], headers={MODEL_VERSION_HEADER: model.version}
+    )
+
+
+def _copy_upload(source: BinaryIO) -> tempfile.SpooledTemporaryFile[bytes]:
+    upload = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    source.seek(0)
+    shutil.copyfileobj(source, upload)
+    upload.seek(0)
+    return upload
+
+
+def _observe_batch_sizes(predictions: Iterable["pd.DataFrame"], route: str) -> Iterator["pd.DataFrame"]:
+    for chunk in predictions:
+        BATCH_SIZE.observe(len(chunk), route=route)
+        yield chunk
+
+
+@app.post("/predictions/json", dependencies=[Depends(_require_model)])
+async def predict_json(request: Request, pred_data: AnimalPrediction, layout: Layout = "records"):
+    from animal_shelter.helper.serialization import frame_to_json
+
+    predictions = await request.app.state.batcher.submit(pred_data)
+    return Response(
+        frame_to_json(predictions, layout), media_type="application/json",
+        headers={MODEL_VERSION_HEADER: predictions.attrs["model_version"]},
+    )
 
 
 @app.post("/predictions/json-list")
-async def predict_json_list(pred_data: ListAnimalPrediction):
-    return pjl(pred_data, DefaultPaths.ANIMAL_MODEL_PATH).to_dict(orient="records")
+async def predict_json_list(
+    request: Request, pred_data: ListAnimalPrediction, layout: Layout = "records", model=Depends(_require_model)
+):
+    from animal_shelter.helper.serialization import frame_to_json
+    from animal_shelter.model.predict import predict_json_list as pjl
+
+    BATCH_SIZE.observe(len(pred_data.predictions), route="/predictions/json-list")
+    predictions = await request.app.state.executor.run(
+        pjl, pred_data, model.pipeline, DefaultSettings.PREDICTION_ENGINE
+    )
+    # Encoding in the pool keeps large batches from blocking the event loop.
+    body = await request.app.state.executor.run(frame_to_json, predictions, layout)
+    return Response(body, media_type="application/json", headers={MODEL_VERSION_HEADER: model.version})
+
+
+@app.post("/predictions/json-columns")
+async def predict_json_columns(
+    request: Request, pred_data: ColumnarAnimalPrediction, layout: Layout = "records", model=Depends(_require_model)
+):
+    """Like /predictions/json-list, with one list per field instead of one object per animal."""
+    from animal_shelter.helper.serialization import frame_to_json
+    from animal_shelter.model.predict import predict_columns
+
+    BATCH_SIZE.observe(len(pred_data), route="/predictions/json-columns")
+    predictions = await request.app.state.executor.run(
+        predict_columns, pred_data, model.pipeline, DefaultSettings.PREDICTION_ENGINE
+    )
+    body = await request.app.state.executor.run(frame_to_json, predictions, layout)
+    return Response(body, media_type="application/json", headers={MODEL_VERSION_HEADER: model.version})
+
+
+@app.post("/predictions/table")
+async def predict_table_body(request: Request, layout: Layout = "records", model=Depends(_require_model)):
+    """Predict a batch sent as an Arrow IPC stream or a Parquet file, chosen by the Content-Type header."""
+    from animal_shelter.helper.serialization import frame_to_json
+    from animal_shelter.model.tables import HAS_PYARROW, TABLE_FORMATS, InvalidTableError, predict_table
+
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if media_type not in TABLE_FORMATS or not HAS_PYARROW:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type must be one of {list(TABLE_FORMATS)}" if HAS_PYARROW else "pyarrow is not installed",
+        )
+
+    body = await request.body()
+    try:
+        predictions = await request.app.state.executor.run(
+            predict_table, body, TABLE_FORMATS[media_type], model.pipeline, DefaultSettings.PREDICTION_ENGINE
+        )
+    except InvalidTableError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    BATCH_SIZE.observe(len(predictions), route="/predictions/table")
+
+    body = await request.app.state.executor.run(frame_to_json, predictions, layout)
+    return Response(body, media_type="application/json", headers={MODEL_VERSION_HEADER: model.version})
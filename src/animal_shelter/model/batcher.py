@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+LOG = logging.getLogger(__name__)
+
+
+async def _run_inline(func, *args):
+    return func(*args)
+
+
+class MicroBatcher:
+    """Collects concurrent single-item requests and scores them in one call.
+
+    A batch is closed when it holds ``max_batch_size`` items or ``max_wait``
+    seconds after its first item arrived, whichever comes first. Each caller
+    receives the row of the result that belongs to its own item.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[list], "pd.DataFrame"],
+        max_batch_size: int,
+        max_wait: float,
+        run: Callable[..., Awaitable] = _run_inline,
+    ):
+        """
+        :param predict_batch: scores a list of items, returning one row per item in the same order
+        :param max_batch_size: maximum number of items scored together
+        :param max_wait: seconds to wait for more items after the first one arrived
+        :param run: coroutine used to call predict_batch, e.g. BoundedExecutor.run
+        """
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batch_sizes: Counter[int] = Counter()
+        self._run = run
+        # Replaced by start(), so the queue belongs to the running event loop.
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._collector: asyncio.Task | None = None
+        self._scoring: set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._collector = asyncio.create_task(self._collect())
+
+    async def stop(self) -> None:
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, *self._scoring, return_exceptions=True)
+
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+
+    async def submit(self, item: Any) -> "pd.DataFrame":
+        """Queue an item for the next batch and wait for its one-row result."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    def stats(self) -> dict:
+        batches = self.batch_sizes.total()
+        items = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": items / batches if batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+        }
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Score in the background so the next batch can be collected meanwhile.
+            task = asyncio.create_task(self._score(batch))
+            self._scoring.add(task)
+            task.add_done_callback(self._scoring.discard)
+
+    async def _score(self, batch: list[tuple[Any, asyncio.Future]]) -> None:
+        self.batch_sizes[len(batch)] += 1
+        LOG.debug("Scoring micro-batch of %d items", len(batch))
+        await self._resolve(batch)
+
+    async def _resolve(self, batch: list[tuple[Any, asyncio.Future]]) -> None:
+        try:
+            result = await self._run(self.predict_batch, [item for item, _ in batch])
+        except Exception as exc:
+            if len(batch) == 1:
+                _set_exception(batch[0][1], exc)
+                return
+            # Score items on their own so one invalid item does not fail its whole batch.
+            await asyncio.gather(*(self._resolve([entry]) for entry in batch))
+            return
+
+        for position, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(result.iloc[[position]])
+
+
+def _set_exception(future: asyncio.Future, exc: Exception) -> None:
+    if not future.done():
+        future.set_exception(exc)
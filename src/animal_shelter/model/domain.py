@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from datetime import datetime
 
 
@@ -15,3 +15,25 @@ class AnimalPrediction(BaseModel):
 
 class ListAnimalPrediction(BaseModel):
     predictions: list[AnimalPrediction]
+
+
+class ColumnarAnimalPrediction(BaseModel):
+    """Batch of animals as one list per AnimalPrediction field, all of the same length."""
+    id: list[int]
+    name: list[str | None] | None = None
+    date_time: list[datetime]
+    animal_type: list[str]
+    sex_upon_outcome: list[str]
+    age_upon_outcome: list[str]
+    breed: list[str]
+    color: list[str]
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        lengths = {field: len(values) for field, values in self if values is not None}
+        if len(set(lengths.values())) > 1:
+            raise ValueError(f"All fields must have the same number of values, got {lengths}")
+        return self
+
+    def __len__(self) -> int:
+        return len(self.id)
@@ -0,0 +1,129 @@
+import logging
+import math
+from pathlib import Path
+from weakref import WeakKeyDictionary
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from sklearn.pipeline import Pipeline
+
+from animal_shelter.feature.default_features import DefaultFeatures
+from animal_shelter.feature.enhancer import derive_record_features
+from animal_shelter.model.domain import AnimalPrediction
+from animal_shelter.model.forest import forest_predict_proba
+from animal_shelter.model.predict import _load_model, predict_animals
+
+LOG = logging.getLogger(__name__)
+
+
+class CompiledPipeline:
+    """Fitted pipeline from train._build_pipeline, evaluated on plain records.
+
+    The imputer and scaler parameters and the one-hot encoding are extracted
+    once, so scoring a single animal only needs Python arithmetic and one call
+    to the forest instead of a DataFrame round trip through the ColumnTransformer.
+    """
+
+    def __init__(self, pipeline: Pipeline):
+        col_transformer = pipeline.named_steps["col_transformer"]
+        self.pipeline = pipeline
+        self.classes = [str(label).lower() for label in pipeline.classes_]
+        self.n_features = max(indices.stop for indices in col_transformer.output_indices_.values())
+
+        numeric = col_transformer.named_transformers_["numeric"]
+        imputer, scaler = numeric.named_steps["imputer"], numeric.named_steps["scaler"]
+        numeric_indices = col_transformer.output_indices_["numeric"]
+        numeric_columns = range(numeric_indices.start, numeric_indices.stop)
+        self.numeric = [
+            (feature, column, fill, mean, scale)
+            for feature, column, fill, mean, scale in zip(
+                DefaultFeatures.NUM_FEATURES, numeric_columns,
+                imputer.statistics_, scaler.mean_, scaler.scale_,
+            )
+        ]
+
+        onehot = col_transformer.named_transformers_["categorical"].named_steps["onehot"]
+        column = col_transformer.output_indices_["categorical"].start
+        self.categorical = []
+        for feature, categories, drop_index in zip(
+            DefaultFeatures.CATEGORY_FEATURES, onehot.categories_, _drop_indices(onehot)
+        ):
+            columns: dict[str, int | None] = {}
+            for index, category in enumerate(categories):
+                if index == drop_index:
+                    columns[category] = None
+                else:
+                    columns[category] = column
+                    column += 1
+            self.categorical.append((feature, columns))
+
+    def transform(self, features: dict) -> np.ndarray:
+        """Encode derived features exactly like the fitted ColumnTransformer."""
+        x = np.zeros((1, self.n_features))
+
+        for feature, column, fill, mean, scale in self.numeric:
+            value = features[feature]
+            if value is None or math.isnan(value):
+                value = fill
+            x[0, column] = (value - mean) / scale
+
+        for feature, columns in self.categorical:
+            value = features[feature]
+            if value not in columns:
+                raise ValueError(f"Found unknown category {value!r} in feature {feature}")
+            if columns[value] is not None:
+                x[0, columns[value]] = 1.0
+
+        return x
+
+    def predict_proba(self, record: dict, engine: str = "sklearn") -> dict:
+        """Class probabilities for one raw animal record."""
+        x = self.transform(derive_record_features(record))
+        probabilities = forest_predict_proba(self.pipeline, x, engine)[0]
+        return dict(zip(self.classes, probabilities.tolist()))
+
+
+_COMPILED: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def compile_pipeline(pipeline: Pipeline) -> CompiledPipeline:
+    """Return the compiled form of a fitted pipeline, compiling it once per pipeline object."""
+    compiled = _COMPILED.get(pipeline)
+    if compiled is None:
+        compiled = _COMPILED[pipeline] = CompiledPipeline(pipeline)
+
+    return compiled
+
+
+def predict_record(data: BaseModel | dict, model: Path | Pipeline, engine: str = "sklearn") -> dict:
+    """Predict a single animal without going through pandas.
+    :param data: AnimalPrediction or dict with the same fields
+    :param model: which model to use, a path or a loaded pipeline
+    :param engine: how to evaluate the forest (see forest_predict_proba)
+    :return: id, name and one probability per class, same values as predict()
+    """
+    record = data.model_dump() if isinstance(data, BaseModel) else data
+    compiled = compile_pipeline(_load_model(model))
+
+    return {"id": record["id"], "name": record.get("name"), **compiled.predict_proba(record, engine)}
+
+
+def predict_micro_batch(
+    animals: list[AnimalPrediction], model: Path | Pipeline, engine: str = "sklearn"
+) -> pd.DataFrame:
+    """Score a micro-batch, using the record path when it holds a single animal.
+    :param animals: animals to score
+    :param model: which model to use, a path or a loaded pipeline
+    :param engine: how to evaluate the forest (see forest_predict_proba)
+    :return: one row of predictions per animal
+    """
+    if len(animals) == 1:
+        return pd.DataFrame([predict_record(animals[0], model, engine)])
+    return predict_animals(animals, model, engine)
+
+
+def _drop_indices(onehot) -> list:
+    if onehot.drop_idx_ is None:
+        return [None] * len(onehot.categories_)
+    return list(onehot.drop_idx_)
@@ -0,0 +1,235 @@
+import logging
+from weakref import WeakKeyDictionary
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+
+from animal_shelter.helper.instrumentation import instrumented
+
+LOG = logging.getLogger(__name__)
+
+ENGINES = ["sklearn", "flat", "auto"]
+# Below this many rows the flattened forest beats sklearn's per-tree dispatch.
+AUTO_FLAT_MAX_ROWS = 500
+
+
+class FlatForest:
+    """All trees of a fitted forest classifier in contiguous NumPy arrays.
+
+    Nodes of every tree are stored back to back and leaves point to themselves.
+    A batch descends all trees at once, one level per step, dropping the
+    (row, tree) pairs that reached a leaf, and the class distributions of the
+    leaves are averaged per row.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes_):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes_
+        # children[2 * node + goes_left] is the next node, which saves a gather per level.
+        self._children = np.stack([right, left], axis=1).ravel()
+        self._is_leaf = left == np.arange(len(left))
+
+    @classmethod
+    def from_forest(cls, forest: RandomForestClassifier) -> "FlatForest":
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("Only single output forests can be flattened")
+
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        feature, threshold, left, right, value = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            nodes = np.arange(tree.node_count) + offset
+            is_leaf = tree.children_left == -1
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            left.append(np.where(is_leaf, nodes, tree.children_left + offset))
+            right.append(np.where(is_leaf, nodes, tree.children_right + offset))
+            # Same normalization as DecisionTreeClassifier.predict_proba.
+            counts = tree.value[:, 0, :]
+            normalizer = counts.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            value.append(counts / normalizer)
+
+        return cls(
+            feature=np.concatenate(feature),
+            threshold=np.concatenate(threshold),
+            left=np.concatenate(left),
+            right=np.concatenate(right),
+            value=np.concatenate(value),
+            roots=offsets[:-1],
+            classes_=forest.classes_,
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def predict_proba(self, x, batch_size: int = 4096) -> np.ndarray:
+        """Average class probabilities of all trees, like RandomForestClassifier.predict_proba.
+        :param x: transformed feature matrix
+        :param batch_size: rows evaluated at once, bounds the (rows x trees) work arrays
+        :return: probabilities with one column per class
+        """
+        # The forest compares float32 features with float64 thresholds, so cast the same way.
+        x = np.asarray(x, dtype=np.float32)
+        proba = np.empty((len(x), self.value.shape[1]))
+        for start in range(0, len(x), batch_size):
+            proba[start:start + batch_size] = self._predict_batch(x[start:start + batch_size])
+
+        return proba
+
+    def _predict_batch(self, x: np.ndarray) -> np.ndarray:
+        n_rows, n_features = x.shape
+        x = x.ravel()
+        leaves = np.tile(self.roots, n_rows)
+
+        # Walk the (row, tree) pairs that have not reached a leaf yet.
+        pairs = np.flatnonzero(~self._is_leaf[leaves])
+        nodes = leaves[pairs]
+        row_starts = pairs // self.n_trees * n_features
+        while pairs.size:
+            goes_left = np.take(x, row_starts + np.take(self.feature, nodes)) <= np.take(self.threshold, nodes)
+            nodes = np.take(self._children, 2 * nodes + goes_left)
+
+            done = np.take(self._is_leaf, nodes)
+            if done.any():
+                leaves[pairs[done]] = nodes[done]
+                pairs, nodes, row_starts = pairs[~done], nodes[~done], row_starts[~done]
+
+        leaf_values = np.take(self.value, leaves.reshape(n_rows, self.n_trees), axis=0)
+        return leaf_values.sum(axis=1, dtype=np.float64) / self.n_trees
+
+
+class CompactForest(ClassifierMixin, BaseEstimator):
+    """Small, picklable replacement for a fitted forest classifier in a pipeline.
+
+    Only what prediction needs is kept: per node the split feature (uint16),
+    the split threshold (float32) and the children as indices within their tree
+    (uint16), and class probabilities (float32) for leaves only. Thresholds are
+    rounded down to the nearest float32, which keeps every split decision on the
+    float32 features unchanged; the float32 leaf probabilities change
+    predictions by less than 1e-6. Evaluation uses the FlatForest rebuilt
+    from these arrays on first use. It is inference only and has no fit, build
+    it from a fitted forest with from_forest or compact_pipeline.
+    """
+
+    def __init__(self, feature, threshold, left, right, leaf_values, node_counts, classes_):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_values = leaf_values
+        self.node_counts = node_counts
+        self.classes_ = classes_
+        self._flat = None
+
+    @classmethod
+    def from_forest(cls, forest: RandomForestClassifier) -> "CompactForest":
+        flat = FlatForest.from_forest(forest)
+        node_counts = np.diff(np.append(flat.roots, len(flat.feature)))
+        if node_counts.max() > np.iinfo(np.uint16).max or forest.n_features_in_ > np.iinfo(np.uint16).max:
+            raise ValueError("Trees or feature matrix too large for 16 bit node and feature indices")
+
+        offsets = np.repeat(flat.roots, node_counts)
+        threshold = flat.threshold.astype(np.float32)
+        rounded_up = threshold > flat.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+
+        return cls(
+            feature=flat.feature.astype(np.uint16),
+            threshold=np.where(flat._is_leaf, np.float32(0), threshold),
+            # Leaves point to themselves, so a child index equal to the node marks a leaf.
+            left=(flat.left - offsets).astype(np.uint16),
+            right=(flat.right - offsets).astype(np.uint16),
+            leaf_values=flat.value[flat._is_leaf].astype(np.float32),
+            node_counts=node_counts.astype(np.uint32),
+            classes_=forest.classes_,
+        )
+
+    def to_flat(self) -> FlatForest:
+        if self._flat is None:
+            # Keep the narrow dtypes where FlatForest allows it, so the expanded forest stays small.
+            index_dtype = np.int32 if self.node_counts.sum() < 2**30 else np.int64
+            roots = np.concatenate([[0], np.cumsum(self.node_counts[:-1], dtype=np.int64)])
+            offsets = np.repeat(roots, self.node_counts).astype(index_dtype)
+            left = self.left.astype(index_dtype) + offsets
+            is_leaf = left == np.arange(len(left))
+            value = np.zeros((len(left), self.leaf_values.shape[1]), dtype=np.float32)
+            value[is_leaf] = self.leaf_values
+
+            self._flat = FlatForest(
+                feature=self.feature,
+                threshold=self.threshold,
+                left=left,
+                right=self.right.astype(index_dtype) + offsets,
+                value=value,
+                roots=roots,
+                classes_=self.classes_,
+            )
+        return self._flat
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.node_counts)
+
+    def __sklearn_is_fitted__(self) -> bool:
+        return True
+
+    def predict_proba(self, x) -> np.ndarray:
+        return self.to_flat().predict_proba(x)
+
+    def predict(self, x) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(x), axis=1)]
+
+    def __getstate__(self):
+        return {**super().__getstate__(), "_flat": None}
+
+
+def compact_pipeline(pipeline: Pipeline) -> Pipeline:
+    """Copy of a fitted pipeline with its forest replaced by a CompactForest."""
+    steps = pipeline.steps[:-1] + [(pipeline.steps[-1][0], CompactForest.from_forest(pipeline.steps[-1][1]))]
+    compact = Pipeline(steps)
+    compact.__dict__.update({key: value for key, value in vars(pipeline).items() if key.endswith("_")})
+    return compact
+
+
+_FLATTENED: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def flatten_pipeline(pipeline: Pipeline) -> FlatForest:
+    """Return the flattened forest of a fitted pipeline, flattening it once per pipeline object."""
+    model = pipeline.named_steps["model"]
+    if isinstance(model, CompactForest):
+        return model.to_flat()
+
+    flat_forest = _FLATTENED.get(pipeline)
+    if flat_forest is None:
+        flat_forest = _FLATTENED[pipeline] = FlatForest.from_forest(model)
+        LOG.info("Flattened forest of %d trees with %d nodes", flat_forest.n_trees, len(flat_forest.feature))
+
+    return flat_forest
+
+
+@instrumented("predict_proba")
+def forest_predict_proba(pipeline: Pipeline, xt, engine: str = "sklearn") -> np.ndarray:
+    """Class probabilities from the forest of a fitted pipeline.
+    :param pipeline: fitted pipeline ending in a forest classifier
+    :param xt: features already transformed by the preceding pipeline steps
+    :param engine: sklearn, flat, or auto to use the flattened forest for small batches
+    :return: probabilities with one column per class
+    """
+    if engine == "auto":
+        engine = "flat" if len(xt) <= AUTO_FLAT_MAX_ROWS else "sklearn"
+
+    if engine == "sklearn":
+        return pipeline.named_steps["model"].predict_proba(xt)
+    if engine == "flat":
+        return flatten_pipeline(pipeline).predict_proba(xt)
+    raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
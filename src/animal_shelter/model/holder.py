@@ -0,0 +1,107 @@
+import dataclasses
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from sklearn.pipeline import Pipeline
+
+from animal_shelter.model.registry import MODEL_REGISTRY, ModelKey, model_key
+from animal_shelter.model.warm_up import WarmUpSummary, warm_up
+
+LOG = logging.getLogger(__name__)
+
+# Version reported for models saved before versions were recorded.
+UNVERSIONED = "unversioned"
+
+
+@dataclass(frozen=True)
+class ActiveModel:
+    """A loaded and warmed up model together with the file version it was loaded from."""
+    pipeline: Pipeline
+    version: str
+    key: ModelKey
+    warm_up: WarmUpSummary
+
+
+@dataclass
+class HolderStats:
+    reloads: int = 0
+    failures: int = 0
+
+
+class ModelHolder:
+    """Serves one model at a time and swaps to a newly published one without blocking requests.
+
+    Requests read ``current`` once and keep using that pipeline until they are
+    done, so a swap never changes the model in the middle of a request. A
+    watcher thread checks the model file every ``poll_interval`` seconds; a
+    changed file is loaded and warmed up on the watcher thread and only then
+    replaces the current model. A file that fails to load keeps the current
+    model in place.
+    """
+
+    def __init__(self, model_path: Path, warm_up_rows: int, engine: str = "sklearn", poll_interval: float = 5.0):
+        self.model_path = Path(model_path)
+        self.warm_up_rows = warm_up_rows
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.stats = HolderStats()
+        self._current: ActiveModel | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def current(self) -> ActiveModel | None:
+        return self._current
+
+    def load(self) -> ActiveModel:
+        """Load and warm up the model file and make it the current model, raising when that fails."""
+        key = model_key(self.model_path)
+        start = time.perf_counter()
+        pipeline = MODEL_REGISTRY.get(self.model_path, mmap_mode="r")
+        load_seconds = time.perf_counter() - start
+
+        summary = dataclasses.replace(warm_up(pipeline, self.warm_up_rows, self.engine), load_seconds=load_seconds)
+        active = ActiveModel(pipeline, getattr(pipeline, "version_", UNVERSIONED), key, summary)
+        with self._lock:
+            previous, self._current = self._current, active
+        LOG.info("Serving model version %s (previously %s)", active.version, previous and previous.version)
+        return active
+
+    def reload(self) -> bool:
+        """Load the model file when it changed since the current model was loaded.
+        :return: whether a new model was swapped in
+        """
+        try:
+            if self._current is not None and model_key(self.model_path) == self._current.key:
+                return False
+            self.load()
+        except Exception:
+            self.stats.failures += 1
+            LOG.exception("Reloading the model at %s failed, keeping version %s",
+                          self.model_path, self._current and self._current.version)
+            return False
+
+        self.stats.reloads += 1
+        return True
+
+    def start(self) -> None:
+        """Start watching the model file for newly published versions."""
+        if self.poll_interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="model-holder", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.reload()
@@ -2,59 +2,110 @@ import logging
 from io import BytesIO
 from pathlib import Path
 
-import joblib
+import numpy as np
 import pandas as pd
 from sklearn.pipeline import Pipeline
 
 from animal_shelter.feature.default_features import DefaultFeatures
 from animal_shelter.feature.enhancer import add_features
 from animal_shelter.helper.data_loader import convert_camel_case, standardize
-from animal_shelter.model.domain import AnimalPrediction, ListAnimalPrediction
+from animal_shelter.helper.instrumentation import instrumented, stage
+from animal_shelter.model.domain import AnimalPrediction, ColumnarAnimalPrediction, ListAnimalPrediction
+from animal_shelter.model.forest import forest_predict_proba
+from animal_shelter.model import prediction_cache
+from animal_shelter.model.prediction_cache import PREDICTION_CACHE, PredictionCache
+from animal_shelter.model.registry import MODEL_REGISTRY
 
 LOG = logging.getLogger(__name__)
 
 
-def predict_file(data: bytes, model_path: Path) -> pd.DataFrame:
+def predict_file(data: bytes, model: Path | Pipeline, engine: str = "sklearn") -> pd.DataFrame:
     raw_data = standardize(pd.read_csv(BytesIO(data)))
-    return predict(raw_data, model_path)
+    return predict(raw_data, model, engine=engine)
 
 
-def predict_json(data: AnimalPrediction, model_path: Path) -> pd.DataFrame:
+def predict_json(data: AnimalPrediction, model: Path | Pipeline, engine: str = "sklearn") -> pd.DataFrame:
     dumped_model = [data.model_dump()]
     raw_data = pd.DataFrame.from_dict(dumped_model)
-    return predict(raw_data, model_path)
+    return predict(raw_data, model, engine=engine)
 
 
-def predict_json_list(data: ListAnimalPrediction, model_path: Path) -> pd.DataFrame:
-    dumped_models = list(map((lambda x: x.model_dump()), data.predictions))
+def predict_json_list(data: ListAnimalPrediction, model: Path | Pipeline, engine: str = "sklearn") -> pd.DataFrame:
+    return predict_animals(data.predictions, model, engine=engine)
+
+
+def predict_columns(data: ColumnarAnimalPrediction, model: Path | Pipeline, engine: str = "sklearn") -> pd.DataFrame:
+    """Predict a batch sent as one list per field, without creating an object per animal."""
+    columns = data.model_dump()
+    if columns["name"] is None:
+        columns["name"] = [None] * len(data)
+    return predict(pd.DataFrame(columns), model, engine=engine)
+
+
+def predict_animals(animals: list[AnimalPrediction], model: Path | Pipeline, engine: str = "sklearn") -> pd.DataFrame:
+    dumped_models = list(map((lambda x: x.model_dump()), animals))
     raw_data = pd.DataFrame.from_records(dumped_models)
-    return predict(raw_data, model_path)
+    return predict(raw_data, model, engine=engine)
 
 
-def predict(raw_data: pd.DataFrame, model_path: Path) -> pd.DataFrame:
+@instrumented()
+def predict(
+    raw_data: pd.DataFrame,
+    model: Path | Pipeline,
+    memoize: bool = False,
+    engine: str = "sklearn",
+    cache: PredictionCache | None = PREDICTION_CACHE,
+) -> pd.DataFrame:
     """Generate predictions on the provided data.
+
+    Rows with the same features are scored once, and the probabilities of
+    feature vectors scored before with the same model and engine come from
+    the cache, so only new distinct vectors reach the forest.
     :data: path to the data
-    :model_path: which model to use
+    :model: which model to use, the path of a saved model or a loaded pipeline
+    :memoize: derive the categorical features per distinct value (see add_features)
+    :engine: how to evaluate the forest, sklearn, flat or auto (see forest_predict_proba)
+    :cache: prediction cache to use, None to only deduplicate the batch
     """
-    LOG.debug("Using model %s", model_path)
-
-    with_features = add_features(raw_data)
+    with_features = add_features(raw_data, memoize=memoize)
     x = with_features[DefaultFeatures.CATEGORY_FEATURES + DefaultFeatures.NUM_FEATURES]
 
-    model = _load_model(model_path)
-    y_pred = model.predict_proba(x)
+    pipeline = _load_model(model)
+    unique, codes = prediction_cache.unique_rows(x)
+    keys = prediction_cache.feature_keys(unique, prediction_cache.model_version(pipeline), engine)
+    cached = cache.get_many(keys) if cache is not None else [None] * len(keys)
+    missing = [position for position, value in enumerate(cached) if value is None]
+
+    unique_proba = np.empty((len(unique), len(pipeline.classes_)))
+    if missing:
+        with stage("column_transformer", rows=len(missing)):
+            xt = pipeline[:-1].transform(unique.iloc[missing])
+        unique_proba[missing] = forest_predict_proba(pipeline, xt, engine)
+        if cache is not None:
+            cache.put_many([keys[position] for position in missing], unique_proba[missing])
+    hits = [position for position, value in enumerate(cached) if value is not None]
+    if hits:
+        unique_proba[hits] = [cached[position] for position in hits]
+    if cache is not None:
+        cache.record_batch(len(x), len(unique))
+    y_pred = unique_proba[codes]
 
     # Combine predictions with class names and animal name.
-    classes = model.classes_.tolist()
-    proba_df = pd.DataFrame(y_pred, columns=classes).rename(str.lower, axis=1)
+    classes = pipeline.classes_.tolist()
+    proba_df = pd.DataFrame(y_pred, columns=classes, index=raw_data.index).rename(str.lower, axis=1)
 
     return raw_data[["id"]].join(raw_data[["name"]]).join(proba_df)
 
 
-def _load_model(model_path: Path) -> Pipeline:
-    """Load the model from the given path
-    :param model_path: path to the model
-    :return: model pipeline
+@instrumented()
+def _load_model(model: Path | Pipeline) -> Pipeline:
+    """Load the model from the given path, reusing the cached pipeline when the file is unchanged
+    :param model: path to the model, or an already loaded pipeline which is returned as is
+    :return: model pipeline, its forest memory mapped when the model was saved in the compact format
     """
+    if isinstance(model, Pipeline):
+        return model
+
     # This function could point to an experiment tracking system instead of to a local serialized model
-    return joblib.load(model_path)
+    LOG.debug("Using model %s", model)
+    return MODEL_REGISTRY.get(model, mmap_mode="r")
@@ -0,0 +1,125 @@
+import logging
+import math
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Hashable, Sequence
+from dataclasses import asdict, dataclass
+from weakref import WeakKeyDictionary
+
+import numpy as np
+import pandas as pd
+
+from animal_shelter.settings import DefaultSettings
+
+LOG = logging.getLogger(__name__)
+
+
+@dataclass
+class PredictionCacheStats:
+    rows: int = 0
+    unique_rows: int = 0
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of distinct feature vectors answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Share of rows that were duplicates of another row in their batch."""
+        return 1 - self.unique_rows / self.rows if self.rows else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "hit_rate": self.hit_rate, "dedup_ratio": self.dedup_ratio}
+
+
+class PredictionCache:
+    """Least recently used class probabilities per model and feature vector.
+
+    The model only sees a handful of derived features, so the number of distinct
+    feature vectors is small compared to the number of animals scored. Keys
+    hold the model version, the engine and the feature values, with missing
+    values normalized to None so they compare equal. A max_size of 0 disables
+    caching; batches are still deduplicated.
+    """
+
+    def __init__(self, max_size: int = DefaultSettings.PREDICTION_CACHE_SIZE):
+        self.max_size = max_size
+        self.stats = PredictionCacheStats()
+        self._entries: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, keys: Sequence[Hashable]) -> list[np.ndarray | None]:
+        with self._lock:
+            values = [self._entries.get(key) for key in keys]
+            for key, value in zip(keys, values):
+                if value is not None:
+                    self._entries.move_to_end(key)
+            hits = sum(value is not None for value in values)
+            self.stats.hits += hits
+            self.stats.misses += len(keys) - hits
+        return values
+
+    def put_many(self, keys: Sequence[Hashable], values: np.ndarray) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def record_batch(self, rows: int, unique_rows: int) -> None:
+        with self._lock:
+            self.stats.rows += rows
+            self.stats.unique_rows += unique_rows
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.stats = PredictionCacheStats()
+
+
+def unique_rows(x: pd.DataFrame) -> tuple[pd.DataFrame, np.ndarray]:
+    """Distinct rows of a feature frame and, per row, the position of its distinct row.
+    :param x: feature frame
+    :return: the distinct rows in order of first appearance, and codes such that
+        unique.iloc[codes] has the rows of x
+    """
+    codes = x.groupby(list(x.columns), sort=False, dropna=False, observed=True).ngroup().to_numpy()
+    # Codes count up in order of first appearance, so the first rows come out in that order too.
+    _, first_rows = np.unique(codes, return_index=True)
+    return x.iloc[first_rows], codes
+
+
+def feature_keys(unique: pd.DataFrame, model_version: Hashable, engine: str) -> list[tuple]:
+    """Cache keys of feature rows, with NaN replaced by None so equal rows get equal keys."""
+    return [
+        (model_version, engine, tuple(None if isinstance(value, float) and math.isnan(value) else value
+                                      for value in row))
+        for row in unique.itertuples(index=False, name=None)
+    ]
+
+
+_VERSIONS: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def model_version(pipeline) -> Hashable:
+    """Version of a pipeline for cache keys, a random one per object for models saved without version."""
+    version = getattr(pipeline, "version_", None)
+    if version is None:
+        version = _VERSIONS.get(pipeline)
+        if version is None:
+            version = _VERSIONS[pipeline] = f"unversioned-{uuid.uuid4().hex}"
+    return version
+
+
+PREDICTION_CACHE = PredictionCache()
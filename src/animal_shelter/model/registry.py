@@ -0,0 +1,107 @@
+import logging
+import os
+import threading
+import time
+import warnings
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import joblib
+import sklearn
+from sklearn.pipeline import Pipeline
+
+from animal_shelter.model.train import read_manifest
+
+LOG = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelKey:
+    """Identifies one version of a serialized model on disk."""
+    path: Path
+    mtime_ns: int
+    size: int
+    # Publishing renames a new file over the path, which changes the inode.
+    inode: int
+
+
+@dataclass
+class RegistryStats:
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    load_seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class ModelRegistry:
+    """Process-wide cache of deserialized model pipelines.
+
+    Models are keyed by their resolved path together with the file mtime, size and
+    inode, so a retrained model written to the same path is picked up on the next lookup.
+    """
+
+    def __init__(self):
+        self._models: dict[Path, tuple[ModelKey, Pipeline]] = {}
+        self._lock = threading.Lock()
+        self.stats = RegistryStats()
+
+    def get(self, model_path: Path, mmap_mode: str | None = None) -> Pipeline:
+        """Return the model stored at the given path, loading it only when needed.
+        :param model_path: path to the model
+        :param mmap_mode: passed to joblib.load, only effective for the uncompressed compact format
+        :return: model pipeline
+        """
+        key = model_key(model_path)
+        with self._lock:
+            cached = self._models.get(key.path)
+            if cached is not None and cached[0] == key:
+                self.stats.hits += 1
+                return cached[1]
+
+            self.stats.misses += 1
+            model = self._load(key, mmap_mode)
+            self._models[key.path] = (key, model)
+            return model
+
+    def warm_up(self, model_path: Path) -> None:
+        """Load the model ahead of the first request.
+        :param model_path: path to the model
+        """
+        self.get(model_path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self.stats = RegistryStats()
+
+    def _load(self, key: ModelKey, mmap_mode: str | None = None) -> Pipeline:
+        start = time.perf_counter()
+        with warnings.catch_warnings():
+            # joblib warns when asked to memory map a compressed file and loads it normally.
+            warnings.filterwarnings(
+                "ignore", message="mmap_mode .* is not compatible with compressed file", category=UserWarning
+            )
+            model = joblib.load(key.path, mmap_mode=mmap_mode)
+        elapsed = time.perf_counter() - start
+
+        manifest = read_manifest(key.path)
+        if manifest is not None and manifest["sklearn_version"] != sklearn.__version__:
+            LOG.warning("Model %s was saved with scikit-learn %s but %s is installed, retrain it if predictions fail",
+                        key.path, manifest["sklearn_version"], sklearn.__version__)
+
+        self.stats.loads += 1
+        self.stats.load_seconds += elapsed
+        LOG.info("Loaded model %s in %.3fs", key.path, elapsed)
+        return model
+
+
+def model_key(model_path: Path) -> ModelKey:
+    path = Path(model_path).resolve()
+    stat = os.stat(path)
+    return ModelKey(path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+MODEL_REGISTRY = ModelRegistry()
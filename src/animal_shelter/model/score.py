@@ -0,0 +1,179 @@
+import logging
+import time
+from collections import deque
+from collections.abc import Generator, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from animal_shelter.helper.data_loader import standardize
+from animal_shelter.helper.serialization import frame_to_json, frame_to_json_lines
+from animal_shelter.model.predict import predict
+from animal_shelter.model.registry import MODEL_REGISTRY
+
+LOG = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ["csv", "parquet"]
+STREAM_MEDIA_TYPES = {"json": "application/json", "ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+@dataclass
+class ScoreSummary:
+    rows: int
+    chunks: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def score_file(
+    input_path: Path,
+    output_path: Path,
+    model_path: Path,
+    chunk_size: int = 100_000,
+    output_format: str | None = None,
+    workers: int = 1,
+) -> ScoreSummary:
+    """Score a CSV file chunk by chunk so memory stays bounded by the chunk size.
+    :param input_path: CSV file with animals to score
+    :param output_path: file to write the predictions to
+    :param model_path: which model to use
+    :param chunk_size: number of rows read and scored at once
+    :param output_format: csv or parquet, derived from the output suffix when omitted
+    :param workers: number of processes scoring chunks in parallel
+    :return: number of rows and chunks scored and the elapsed time
+    """
+    output_format = output_format or _format_from_suffix(output_path)
+    LOG.info("Scoring %s into %s (%s) in chunks of %d rows with %d worker(s)",
+             input_path, output_path, output_format, chunk_size, workers)
+
+    start = time.perf_counter()
+    chunks = read_chunks(input_path, chunk_size)
+    if workers > 1:
+        predictions = score_chunks_parallel(chunks, model_path, workers)
+    else:
+        predictions = score_chunks(chunks, model_path)
+    rows, n_chunks = WRITERS[output_format](predictions, output_path)
+
+    return ScoreSummary(rows, n_chunks, time.perf_counter() - start)
+
+
+def read_chunks(input_path: Path | IO, chunk_size: int) -> Generator[pd.DataFrame, None, None]:
+    with pd.read_csv(input_path, chunksize=chunk_size) as reader:
+        yield from reader
+
+
+def score_chunk(chunk: pd.DataFrame, model: Path | Pipeline, engine: str = "sklearn") -> pd.DataFrame:
+    return predict(standardize(chunk), model, memoize=True, engine=engine)
+
+
+def score_chunks(
+    chunks: Iterable[pd.DataFrame], model: Path | Pipeline, engine: str = "sklearn"
+) -> Iterator[pd.DataFrame]:
+    for chunk in chunks:
+        # A file with only a header gives one empty chunk, which the model cannot score.
+        if not chunk.empty:
+            yield score_chunk(chunk, model, engine)
+
+
+def score_chunks_parallel(chunks: Iterable[pd.DataFrame], model_path: Path, workers: int) -> Iterator[pd.DataFrame]:
+    """Score chunks in a process pool, yielding the results in input order.
+
+    At most two chunks per worker are in flight, so memory stays bounded while
+    the workers are kept busy.
+    """
+    # Loading before the pool starts lets forked workers share the parent's model pages
+    # until they are written to.
+    MODEL_REGISTRY.warm_up(model_path)
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model_path,)) as executor:
+        pending: deque[Future[pd.DataFrame]] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(score_chunk, chunk, model_path))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def _init_worker(model_path: Path) -> None:
+    # A forked worker finds the model in the inherited registry, a spawned worker loads it
+    # once. Only a model saved in the compact format is memory mapped and shared between
+    # spawned workers, every other format gets a copy per worker.
+    MODEL_REGISTRY.get(model_path, mmap_mode="r")
+
+
+def write_csv(predictions: Iterable[pd.DataFrame], output_path: Path) -> tuple[int, int]:
+    rows = n_chunks = 0
+    with open(output_path, "w", newline="") as output_file:
+        for chunk in predictions:
+            chunk.to_csv(output_file, header=n_chunks == 0, index=False)
+            rows += len(chunk)
+            n_chunks += 1
+
+    return rows, n_chunks
+
+
+def write_parquet(predictions: Iterable[pd.DataFrame], output_path: Path) -> tuple[int, int]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = n_chunks = 0
+    writer = None
+    try:
+        for chunk in predictions:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(output_path, table.schema)
+            else:
+                table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+            rows += len(chunk)
+            n_chunks += 1
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return rows, n_chunks
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet}
+
+
+def encode_chunks(predictions: Iterable[pd.DataFrame], output_format: str) -> Iterator[bytes]:
+    """Serialize prediction chunks as they are produced, for a streamed response.
+
+    Every piece holds a complete chunk, so the first piece is only yielded once
+    the first chunk is scored. JSON is encoded like the other prediction
+    endpoints, see frame_to_json.
+    :param predictions: prediction chunks
+    :param output_format: json for one array of records, ndjson for one record per line, or csv
+    :return: encoded pieces that concatenate to the full document
+    """
+    if output_format not in STREAM_MEDIA_TYPES:
+        raise ValueError(f"Unknown format {output_format!r}, expected one of {list(STREAM_MEDIA_TYPES)}")
+
+    n_chunks = 0
+    for chunk in predictions:
+        if output_format == "json":
+            records = frame_to_json(chunk, "records")[1:-1]
+            yield (b"[" if n_chunks == 0 else b",") + records
+        elif output_format == "ndjson":
+            yield frame_to_json_lines(chunk)
+        else:
+            yield chunk.to_csv(header=n_chunks == 0, index=False).encode()
+        n_chunks += 1
+
+    if output_format == "json":
+        yield b"]" if n_chunks else b"[]"
+
+
+def _format_from_suffix(output_path: Path) -> str:
+    return "parquet" if Path(output_path).suffix == ".parquet" else "csv"
@@ -0,0 +1,110 @@
+import importlib.util
+import logging
+from pathlib import Path
+
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from animal_shelter.model.domain import AnimalPrediction
+from animal_shelter.model.predict import predict
+
+LOG = logging.getLogger(__name__)
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+# Request content types accepted for tabular batches.
+TABLE_FORMATS = {
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.parquet": "parquet",
+}
+OPTIONAL_FIELDS = ["name"]
+
+
+class InvalidTableError(ValueError):
+    """Raised when a tabular batch does not match the AnimalPrediction fields."""
+
+
+def predict_table(body: bytes, table_format: str, model: Path | Pipeline, engine: str = "sklearn") -> pd.DataFrame:
+    """Predict a batch sent as an Arrow IPC stream or a Parquet file.
+    :param body: serialized table with one column per AnimalPrediction field
+    :param table_format: arrow or parquet
+    :param model: which model to use, a path or a loaded pipeline
+    :param engine: how to evaluate the forest (see forest_predict_proba)
+    :return: one row of predictions per animal
+    """
+    return predict(read_table(body, table_format), model, engine=engine)
+
+
+def read_table(body: bytes, table_format: str) -> pd.DataFrame:
+    """Deserialize a tabular batch and validate it column by column.
+    :param body: serialized table
+    :param table_format: arrow or parquet
+    :return: one row per animal with the AnimalPrediction fields as columns
+    """
+    import pyarrow as pa
+
+    try:
+        if table_format == "arrow":
+            table = pa.ipc.open_stream(body).read_all()
+        elif table_format == "parquet":
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(pa.BufferReader(body))
+        else:
+            raise InvalidTableError(f"Unknown table format {table_format!r}, expected one of {list(TABLE_FORMATS.values())}")
+    except pa.ArrowException as exc:
+        raise InvalidTableError(f"Cannot read {table_format} body: {exc}") from exc
+
+    return table_to_frame(table)
+
+
+def table_to_frame(table) -> pd.DataFrame:
+    """Check the column types of an Arrow table against AnimalPrediction and convert it to pandas."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    errors = []
+    columns = {}
+    for field in AnimalPrediction.model_fields:
+        if field not in table.column_names:
+            if field not in OPTIONAL_FIELDS:
+                errors.append(f"{field}: missing")
+            continue
+
+        column = table.column(field)
+        if pa.types.is_dictionary(column.type):
+            column = pc.cast(column, column.type.value_type)
+        if field not in OPTIONAL_FIELDS and column.null_count:
+            errors.append(f"{field}: {column.null_count} missing values")
+        if not _has_expected_type(field, column.type):
+            errors.append(f"{field}: unexpected type {column.type}")
+        columns[field] = column
+
+    if errors:
+        raise InvalidTableError("Invalid table: " + "; ".join(errors))
+
+    frame = pa.table(columns).to_pandas()
+    if "name" not in frame:
+        frame["name"] = None
+    if not pd.api.types.is_datetime64_any_dtype(frame["date_time"]):
+        try:
+            frame["date_time"] = pd.to_datetime(frame["date_time"], format="ISO8601")
+        except ValueError as exc:
+            raise InvalidTableError(f"date_time: {exc}") from exc
+
+    return frame
+
+
+def _has_expected_type(field: str, arrow_type) -> bool:
+    import pyarrow as pa
+
+    if field == "id":
+        return pa.types.is_integer(arrow_type)
+    if field == "date_time":
+        return pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type) or _is_text(arrow_type)
+    return _is_text(arrow_type) or pa.types.is_null(arrow_type) and field in OPTIONAL_FIELDS
+
+
+def _is_text(arrow_type) -> bool:
+    import pyarrow as pa
+
+    return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
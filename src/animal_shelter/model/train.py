@@ -1,7 +1,16 @@
+import importlib.util
+import json
 import logging
+import os
+import re
+import shutil
 import string
+import uuid
+from datetime import datetime, timezone
+
 import pandas as pd
 import joblib
+import sklearn
 
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
@@ -11,26 +20,149 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.pipeline import Pipeline
 from pathlib import Path
 
-from animal_shelter.helper.data_loader import load_data
-from animal_shelter.feature.enhancer import add_features
 from animal_shelter.feature.default_features import DefaultFeatures
+from animal_shelter.feature.store import feature_table_id, load_features
+from animal_shelter.model.forest import compact_pipeline
+from animal_shelter.paths import DefaultPaths
 
 LOG = logging.getLogger(__name__)
 
+# Trees added to the forest per incremental training run.
+INCREMENTAL_ESTIMATORS = 10
+# Rows per class taken from earlier data when new rows lack that class.
+BACKFILL_ROWS_PER_CLASS = 50
+# Artifact format: (replace the forest with a CompactForest, joblib compression).
+# None compresses according to the file extension, gzip for the default .gz path.
+# A compression level of 0 writes an uncompressed file. Only the arrays of a CompactForest
+# can be memory mapped from it, scikit-learn copies the node arrays of fitted trees on load.
+ARTIFACT_FORMATS = {
+    "joblib": (False, None),
+    "raw": (False, ("zlib", 0)),
+    "lz4": (False, ("lz4", 3)),
+    "compact": (True, ("zlib", 0)),
+    "compact-lz4": (True, ("lz4", 3)),
+}
+MANIFEST_SUFFIX = ".manifest.json"
+# Versioned model files kept next to the published model.
+KEEP_MODEL_VERSIONS = 3
 
-def train(data_path: string, output_path: Path):
-    raw_data = load_data(data_path)
-    data_with_features = add_features(raw_data)
 
-    x = data_with_features[DefaultFeatures.CATEGORY_FEATURES + DefaultFeatures.NUM_FEATURES]
-    y = data_with_features["outcome_type"]
+def train(
+    data_path: string,
+    output_path: Path,
+    use_feature_cache: bool = True,
+    incremental: bool = False,
+    n_new_estimators: int = INCREMENTAL_ESTIMATORS,
+    feature_cache_dir: Path = DefaultPaths.FEATURE_CACHE_PATH,
+    artifact_format: str = "joblib",
+):
+    """Train the model and save it.
+    :param data_path: CSV file with the training data
+    :param output_path: where the model is saved
+    :param use_feature_cache: reuse cached features of data_path
+    :param incremental: treat data_path as append-only and grow the model saved at output_path
+        with trees fitted on the rows appended since it was trained, see _train_incremental
+    :param n_new_estimators: trees added by an incremental run
+    :param feature_cache_dir: directory holding the cached feature tables
+    :param artifact_format: how the model is saved, see ARTIFACT_FORMATS and _save_model
+    :return: trained model pipeline
+    """
+    _check_artifact_format(artifact_format)
+    if incremental and Path(output_path).exists():
+        model = _train_incremental(data_path, output_path, n_new_estimators, feature_cache_dir, artifact_format)
+        if model is not None:
+            return model
+        LOG.info("Falling back to a full retrain")
+
+    data_with_features = load_features(
+        data_path, cache_dir=feature_cache_dir, use_cache=use_feature_cache, incremental=incremental
+    )
+    x, y = _split_target(data_with_features)
 
     model = _fit_model(_build_pipeline(), x, y)
-    _save_model(model, output_path)
+    model.trained_rows_ = len(x)
+    # Only the incremental feature table tells later runs whether the file was appended to.
+    model.feature_table_id_ = (
+        feature_table_id(data_path, feature_cache_dir) if incremental and use_feature_cache else None
+    )
+    _save_model(model, output_path, artifact_format)
 
     return model
 
-def _build_pipeline(encoder_drop="first"):
+
+def _train_incremental(
+    data_path, output_path: Path, n_new_estimators: int, feature_cache_dir: Path, artifact_format: str = "joblib"
+):
+    """Grow the forest of a saved model with trees fitted on newly appended rows.
+
+    The fitted ColumnTransformer is kept as is: adding encoder categories would
+    shift the columns the existing trees split on. New rows with an unseen
+    category or outcome therefore need a full retrain, as do models that do not
+    record how many rows they were trained on and compact models, whose trees
+    cannot be refitted. So does a rewritten file: the feature table of the file
+    gets a new id when it is rebuilt, which no longer matches the id of the
+    table the model was trained on. Outcomes missing from the new
+    rows are backfilled with earlier rows, so the new trees predict the same
+    classes as the existing ones. The forest keeps growing with every run, a
+    periodic full retrain brings it back to its default size.
+    :param data_path: append-only CSV file with the training data
+    :param output_path: where the model is saved
+    :param n_new_estimators: trees to add
+    :param feature_cache_dir: directory holding the cached feature tables
+    :param artifact_format: how the model is saved
+    :return: updated model pipeline, or None when a full retrain is needed
+    """
+    model = joblib.load(output_path)
+    if not isinstance(model.named_steps["model"], RandomForestClassifier):
+        LOG.info("The model at %s is a compact model, its forest cannot be grown", output_path)
+        return None
+
+    trained_rows = getattr(model, "trained_rows_", None)
+    data_with_features = load_features(data_path, cache_dir=feature_cache_dir, incremental=True)
+    if trained_rows is None or trained_rows > len(data_with_features):
+        LOG.info("Cannot tell which rows of %s are new to the model at %s", data_path, output_path)
+        return None
+    if getattr(model, "feature_table_id_", None) != feature_table_id(data_path, feature_cache_dir):
+        LOG.info("%s was rewritten since the model at %s was trained on it", data_path, output_path)
+        return None
+
+    new_data = data_with_features.iloc[trained_rows:]
+    if new_data.empty:
+        LOG.info("No new rows in %s, keeping the model at %s", data_path, output_path)
+        return model
+
+    forest = model.named_steps["model"]
+    new_outcomes = set(new_data["outcome_type"])
+    unseen_outcomes = new_outcomes - set(forest.classes_)
+    if unseen_outcomes:
+        LOG.info("New rows have unseen outcomes %s", sorted(unseen_outcomes))
+        return None
+
+    old_data = data_with_features.iloc[:trained_rows]
+    backfill = old_data[~old_data["outcome_type"].isin(new_outcomes)]
+    x, y = _split_target(pd.concat([new_data, backfill.groupby("outcome_type").head(BACKFILL_ROWS_PER_CLASS)]))
+    try:
+        xt = model[:-1].transform(x)
+    except ValueError as exc:
+        LOG.info("New rows do not fit the fitted encoder: %s", exc)
+        return None
+
+    LOG.info("Adding %d trees fitted on %d new rows (%d backfilled) to %d trees",
+             n_new_estimators, len(new_data), len(x) - len(new_data), len(forest.estimators_))
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_new_estimators)
+    forest.fit(xt, y)
+    forest.set_params(warm_start=False)
+    model.trained_rows_ = len(data_with_features)
+    _save_model(model, output_path, artifact_format)
+
+    return model
+
+
+def _split_target(data_with_features: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    x = data_with_features[DefaultFeatures.CATEGORY_FEATURES + DefaultFeatures.NUM_FEATURES]
+    return x, data_with_features["outcome_type"]
+
+def _build_pipeline(encoder_drop="first", memory=None):
     num_transformer = Pipeline([
         ("imputer", SimpleImputer()), ("scaler", StandardScaler())
     ])
@@ -44,7 +176,7 @@ def _build_pipeline(encoder_drop="first"):
 
     return Pipeline([
         ("col_transformer", col_transformer), ("model", RandomForestClassifier())
-    ])
+    ], memory=memory)
 
 def _fit_model(model: Pipeline, x: pd.DataFrame, y: pd.Series):
     """Train the model
@@ -55,10 +187,147 @@ def _fit_model(model: Pipeline, x: pd.DataFrame, y: pd.Series):
     """
     return model.fit(x, y)
 
-def _save_model(model: Pipeline, path: Path) -> None:
-    """Save the model.
-    :param model: model object
+def _save_model(model: Pipeline, path: Path, artifact_format: str = "joblib") -> str:
+    """Publish the model at path, with a manifest describing it next to it.
+
+    The model is first written under a versioned name next to path, through a
+    temporary file and a rename, and then linked to path with another rename.
+    Readers of path therefore see either the previous or the new model, never
+    a partially written file. The newest KEEP_MODEL_VERSIONS versioned files
+    are kept, see model_versions for their order.
+
+    Uncompressed formats load fastest. Compact formats swap the forest for a
+    CompactForest, which is several times smaller than the fitted trees,
+    predicts the same classes and, saved uncompressed, is memory mapped on load.
+    :param model: model object, its version is stored as the version_ attribute of the saved pipeline
     :param path: path to the model
+    :param artifact_format: one of ARTIFACT_FORMATS
+    :return: version of the saved model
     """
-    LOG.info("Saving model at %s", path)
-    joblib.dump(model, path)
+    _check_artifact_format(artifact_format)
+    path = Path(path)
+    compact, compress = ARTIFACT_FORMATS[artifact_format]
+    if compact:
+        model = compact_pipeline(model)
+    # Set after compacting, as the compact copy predicts slightly different values than its source.
+    model.version_ = new_model_version()
+
+    versioned_path = path.with_name(f"{path.stem}-{model.version_}{path.suffix}")
+    LOG.info("Saving model at %s as %s", versioned_path, artifact_format)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sequence = max((_version_sequence(version) for version in model_versions(path)), default=0) + 1
+    # Keep the suffix, joblib picks the compression from it when none is given.
+    tmp_path = path.with_name(f".{versioned_path.stem}.{os.getpid()}.tmp{path.suffix}")
+    if compress is None:
+        joblib.dump(model, tmp_path)
+    else:
+        joblib.dump(model, tmp_path, compress=compress)
+    os.replace(tmp_path, versioned_path)
+
+    manifest = {**model_manifest(model, versioned_path, artifact_format), "sequence": sequence}
+    write_manifest(versioned_path, manifest)
+    write_manifest(path, manifest)
+    _replace_with_link(versioned_path, path)
+    LOG.info("Published model version %s at %s", model.version_, path)
+    _prune_versions(path)
+
+    return model.version_
+
+
+def new_model_version() -> str:
+    """Version of a model about to be saved: UTC time of saving plus a random suffix."""
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def model_versions(path: Path) -> list[Path]:
+    """Versioned files of the model published at path, oldest first.
+
+    Files are ordered by the UTC time of saving in their version and, for
+    versions saved within the same second, by the sequence number in their
+    manifest. File times are not used, so copied or touched files keep their
+    place.
+    """
+    path = Path(path)
+    version_name = re.compile(rf"{re.escape(path.stem)}-(\d{{8}}T\d{{6}})-[0-9a-f]{{8}}{re.escape(path.suffix)}")
+    versions = []
+    for candidate in path.parent.glob(f"{path.stem}-*T*-*{path.suffix}"):
+        match = version_name.fullmatch(candidate.name)
+        if match is not None:
+            versions.append((match.group(1), _version_sequence(candidate), candidate))
+
+    return [version for *_, version in sorted(versions)]
+
+
+def _version_sequence(version: Path) -> int:
+    manifest = read_manifest(version)
+    return 0 if manifest is None else manifest.get("sequence", 0)
+
+
+def _replace_with_link(source: Path, target: Path) -> None:
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        # File systems without hard links get a copy.
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def _prune_versions(path: Path) -> None:
+    for old_version in model_versions(path)[:-KEEP_MODEL_VERSIONS]:
+        LOG.info("Removing old model version %s", old_version)
+        old_version.unlink(missing_ok=True)
+        manifest_path(old_version).unlink(missing_ok=True)
+
+
+def _check_artifact_format(artifact_format: str) -> None:
+    if artifact_format not in ARTIFACT_FORMATS:
+        raise ValueError(f"Unknown artifact format {artifact_format!r}, expected one of {list(ARTIFACT_FORMATS)}")
+    compress = ARTIFACT_FORMATS[artifact_format][1]
+    if compress is not None and compress[0] == "lz4" and importlib.util.find_spec("lz4") is None:
+        raise ValueError(f"Artifact format {artifact_format!r} needs the lz4 package, install it with pip install lz4")
+
+
+def model_manifest(model: Pipeline, path: Path, artifact_format: str) -> dict:
+    """Describe a saved model: its format, the versions it was saved with, its features and forest size."""
+    forest = model.named_steps["model"]
+    if isinstance(forest, RandomForestClassifier):
+        n_nodes = sum(tree.tree_.node_count for tree in forest.estimators_)
+        n_trees = len(forest.estimators_)
+    else:
+        n_nodes = len(forest.feature)
+        n_trees = forest.n_estimators
+
+    return {
+        "format": artifact_format,
+        "sklearn_version": sklearn.__version__,
+        "joblib_version": joblib.__version__,
+        "features": DefaultFeatures.CATEGORY_FEATURES + DefaultFeatures.NUM_FEATURES,
+        "classes": [str(name) for name in model.classes_],
+        "n_trees": n_trees,
+        "n_nodes": int(n_nodes),
+        "trained_rows": getattr(model, "trained_rows_", None),
+        "feature_table_id": getattr(model, "feature_table_id_", None),
+        "version": getattr(model, "version_", None),
+        "bytes": os.path.getsize(path),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def manifest_path(model_path: Path) -> Path:
+    return Path(model_path).with_name(Path(model_path).name + MANIFEST_SUFFIX)
+
+
+def read_manifest(model_path: Path) -> dict | None:
+    path = manifest_path(model_path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def write_manifest(model_path: Path, manifest: dict) -> None:
+    path = manifest_path(model_path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, path)
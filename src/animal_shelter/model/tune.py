@@ -0,0 +1,105 @@
+import logging
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+from joblib import Memory
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV
+
+from animal_shelter.feature.store import load_features
+from animal_shelter.model.train import _build_pipeline, _save_model, _split_target
+from animal_shelter.paths import DefaultPaths
+
+LOG = logging.getLogger(__name__)
+
+# The number of trees is the resource successive halving hands out, so it is not searched.
+PARAM_DISTRIBUTIONS = {
+    "col_transformer__categorical__onehot__drop": ["first", "if_binary", None],
+    "model__max_depth": [None, 8, 12, 16, 24],
+    "model__min_samples_leaf": [1, 2, 5, 10, 20],
+    "model__max_features": ["sqrt", "log2", None],
+    "model__class_weight": [None, "balanced", "balanced_subsample"],
+}
+RESULT_COLUMNS = ["rank_test_score", "mean_test_score", "std_test_score", "iter", "n_resources", "mean_fit_time"]
+
+
+@dataclass
+class TuneSummary:
+    best_params: dict
+    best_score: float
+    candidates: int
+    seconds: float
+
+
+def tune(
+    data_path: Path,
+    output_path: Path,
+    results_path: Path,
+    n_candidates: int = 30,
+    min_estimators: int = 20,
+    max_estimators: int = 200,
+    cv: int = 3,
+    n_jobs: int = -1,
+    use_cache: bool = False,
+    random_state: int | None = None,
+    feature_cache_dir: Path = DefaultPaths.FEATURE_CACHE_PATH,
+) -> TuneSummary:
+    """Search forest and encoder options with successive halving and save the best pipeline.
+
+    Candidates start with few trees and the best third gets three times as many
+    in the next round. As every candidate sees the same folds, the fitted
+    ColumnTransformer can be cached per fold and encoder option instead of being
+    refitted for every candidate. With the current features hashing the input
+    for the cache costs more than the preprocessing itself, so it is off by default.
+    :param data_path: CSV file with the training data
+    :param output_path: where the best pipeline, refitted on all data, is saved
+    :param results_path: CSV file for the scores of all candidates, best first
+    :param n_candidates: number of sampled parameter combinations
+    :param min_estimators: trees per candidate in the first round
+    :param max_estimators: upper bound of trees per candidate
+    :param cv: number of cross-validation folds
+    :param n_jobs: parallel fits, -1 uses all cores
+    :param use_cache: cache the preprocessing output across candidates, see benchmarks/bench_tune.py
+    :param random_state: seed for sampling candidates and fitting forests
+    :param feature_cache_dir: directory holding the cached feature tables
+    :return: best parameters and score, number of candidates and elapsed time
+    """
+    x, y = _split_target(load_features(data_path, cache_dir=feature_cache_dir))
+
+    with tempfile.TemporaryDirectory(prefix="animal_shelter_tune_") as cache_dir:
+        memory = Memory(cache_dir, verbose=0) if use_cache else None
+        pipeline = _build_pipeline(memory=memory).set_params(model__random_state=random_state)
+        search = HalvingRandomSearchCV(
+            pipeline,
+            PARAM_DISTRIBUTIONS,
+            n_candidates=n_candidates,
+            resource="model__n_estimators",
+            min_resources=min_estimators,
+            max_resources=max_estimators,
+            cv=cv,
+            scoring="neg_log_loss",
+            n_jobs=n_jobs,
+            random_state=random_state,
+        )
+
+        LOG.info("Searching %d candidates on %d rows (cache %s)", n_candidates, len(x), "on" if use_cache else "off")
+        start = time.perf_counter()
+        search.fit(x, y)
+        seconds = time.perf_counter() - start
+
+    model = search.best_estimator_.set_params(memory=None)
+    model.trained_rows_ = len(x)
+    _save_model(model, output_path)
+    write_results(search, results_path)
+    LOG.info("Best log loss %.4f with %s after %.1fs", -search.best_score_, search.best_params_, seconds)
+
+    return TuneSummary(search.best_params_, search.best_score_, len(search.cv_results_["params"]), seconds)
+
+
+def write_results(search: HalvingRandomSearchCV, results_path: Path) -> None:
+    results = pd.DataFrame(search.cv_results_)
+    results = results[RESULT_COLUMNS + [column for column in results if column.startswith("param_")]]
+    results.sort_values(["rank_test_score", "iter"], ascending=[True, False]).to_csv(results_path, index=False)
@@ -0,0 +1,91 @@
+import itertools
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from animal_shelter.model.domain import AnimalPrediction
+from animal_shelter.model.fast_predict import predict_micro_batch
+from animal_shelter.model.predict import _load_model, predict
+
+LOG = logging.getLogger(__name__)
+
+# Values cycled through to build synthetic animals, covering both animal types,
+# named and unnamed animals, every sex and the age units of the data.
+SYNTHETIC_VALUES: dict[str, list[str | None]] = {
+    "name": ["Rocky", None, "Bella"],
+    "animal_type": ["Dog", "Cat"],
+    "sex_upon_outcome": ["Neutered Male", "Spayed Female", "Intact Male", "Intact Female", "Unknown"],
+    "age_upon_outcome": ["2 years", "1 year", "3 months", "5 weeks", "4 days"],
+    "breed": ["Pit Bull Mix", "Domestic Shorthair Mix", "Chihuahua Shorthair/Dachshund", "Domestic Longhair Mix"],
+    "color": ["Brown/White", "Black", "Blue Tabby"],
+}
+
+
+@dataclass
+class WarmUpSummary:
+    rows: int
+    load_seconds: float
+    batch_seconds: float
+    single_seconds: float
+
+    @property
+    def seconds(self) -> float:
+        return self.load_seconds + self.batch_seconds + self.single_seconds
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "seconds": self.seconds}
+
+
+def synthetic_animals(n_rows: int) -> pd.DataFrame:
+    """Animals with every AnimalPrediction field, in the layout predict expects.
+    :param n_rows: number of animals
+    :return: one row per animal
+    """
+    start = datetime(2015, 1, 1, 9)
+    columns = {field: list(itertools.islice(itertools.cycle(values), n_rows))
+               for field, values in SYNTHETIC_VALUES.items()}
+    return pd.DataFrame({
+        "id": range(n_rows),
+        "date_time": [start + timedelta(hours=i) for i in range(n_rows)],
+        **columns,
+    })[list(AnimalPrediction.model_fields)]
+
+
+def warm_up(model: Path | Pipeline, n_rows: int, engine: str = "sklearn") -> WarmUpSummary:
+    """Load the model and run synthetic animals through it, so the first requests do not pay for it.
+
+    A batch goes through add_features and the forest like /predictions/json-list,
+    with both engines when engine is auto, and a single animal through the
+    record path of /predictions/json.
+    :param model: which model to use, a path or a loaded pipeline
+    :param n_rows: animals in the warm-up batch, 0 or less only loads the model
+    :param engine: how to evaluate the forest (see forest_predict_proba)
+    :return: batch size and time taken per step
+    """
+    start = time.perf_counter()
+    pipeline = _load_model(model)
+    loaded = time.perf_counter()
+    if n_rows <= 0:
+        LOG.info("Loaded model %s in %.3fs, warm-up is disabled", getattr(pipeline, "version_", model), loaded - start)
+        return WarmUpSummary(0, loaded - start, 0.0, 0.0)
+
+    animals = synthetic_animals(n_rows)
+    for batch_engine in ["sklearn", "flat"] if engine == "auto" else [engine]:
+        # Synthetic animals stay out of the prediction cache and its hit rate.
+        predict(animals, pipeline, engine=batch_engine, cache=None)
+    batch_done = time.perf_counter()
+
+    first = AnimalPrediction(**animals.iloc[0].to_dict())
+    predict_micro_batch([first], pipeline, engine)
+    single_done = time.perf_counter()
+
+    summary = WarmUpSummary(n_rows, loaded - start, batch_done - loaded, single_done - batch_done)
+    LOG.info("Warmed up model %s with %d rows in %.3fs (load %.3fs, batch %.3fs, single %.3fs)",
+             getattr(pipeline, "version_", model), n_rows, summary.seconds,
+             summary.load_seconds, summary.batch_seconds, summary.single_seconds)
+    return summary
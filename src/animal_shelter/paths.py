@@ -6,3 +6,6 @@ class DefaultPaths:
     DATA_PATH = PROJECT_ROOT_PATH / "data"
     OUTPUT_PATH = PROJECT_ROOT_PATH / "output"
     ANIMAL_MODEL_PATH = OUTPUT_PATH / "animal_model.gz"
+    FEATURE_CACHE_PATH = OUTPUT_PATH / "feature_cache"
+    TUNED_MODEL_PATH = OUTPUT_PATH / "tuned_animal_model.gz"
+    TUNE_RESULTS_PATH = OUTPUT_PATH / "tune_results.csv"
@@ -0,0 +1,21 @@
+import os
+
+
+class DefaultSettings:
+    PREDICTION_WORKERS = int(os.getenv("ANIMAL_SHELTER_PREDICTION_WORKERS", "4"))
+    PREDICTION_QUEUE_SIZE = int(os.getenv("ANIMAL_SHELTER_PREDICTION_QUEUE_SIZE", "16"))
+
+    MICRO_BATCH_MAX_SIZE = int(os.getenv("ANIMAL_SHELTER_MICRO_BATCH_MAX_SIZE", "64"))
+    MICRO_BATCH_MAX_WAIT_MS = float(os.getenv("ANIMAL_SHELTER_MICRO_BATCH_MAX_WAIT_MS", "5"))
+
+    PREDICTION_ENGINE = os.getenv("ANIMAL_SHELTER_PREDICTION_ENGINE", "auto")
+    # Distinct feature vectors whose predictions are cached, 0 disables the cache.
+    PREDICTION_CACHE_SIZE = int(os.getenv("ANIMAL_SHELTER_PREDICTION_CACHE_SIZE", "10000"))
+    # Synthetic animals scored before the service reports ready, 0 disables warm-up.
+    WARM_UP_ROWS = int(os.getenv("ANIMAL_SHELTER_WARM_UP_ROWS", "64"))
+    # Seconds between checks for a newly published model, 0 disables reloading.
+    MODEL_RELOAD_INTERVAL = float(os.getenv("ANIMAL_SHELTER_MODEL_RELOAD_INTERVAL", "5"))
+
+    INSTRUMENTATION = os.getenv("ANIMAL_SHELTER_INSTRUMENTATION", "false").lower() in ("1", "true", "yes")
+
+    UPLOAD_CHUNK_ROWS = int(os.getenv("ANIMAL_SHELTER_UPLOAD_CHUNK_ROWS", "10000"))
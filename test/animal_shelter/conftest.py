@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+from animal_shelter.feature.default_features import DefaultFeatures
+from animal_shelter.feature.enhancer import add_features
+from animal_shelter.helper.data_loader import load_data
+from animal_shelter.model import train
+from animal_shelter.paths import DefaultPaths
+
+
+@pytest.fixture(scope="session")
+def model_path(tmp_path_factory):
+    """Small forest trained on the training data, saved once per test session."""
+    data = add_features(load_data(DefaultPaths.DATA_PATH / "train.csv"))
+    x = data[DefaultFeatures.CATEGORY_FEATURES + DefaultFeatures.NUM_FEATURES]
+    pipeline = train._build_pipeline().set_params(model__n_estimators=10, model__random_state=0)
+
+    path = tmp_path_factory.mktemp("model") / "animal_model.gz"
+    train._save_model(train._fit_model(pipeline, x, data["outcome_type"]), path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def animals_csv(tmp_path_factory):
+    """The first rows of the test data, in the format clients upload."""
+    path = tmp_path_factory.mktemp("data") / "animals.csv"
+    pd.read_csv(DefaultPaths.DATA_PATH / "test.csv", nrows=50).to_csv(path, index=False)
+    return path
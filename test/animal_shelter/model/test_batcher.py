@@ -0,0 +1,50 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from animal_shelter.model.batcher import MicroBatcher
+
+
+def double(items):
+    if "bad" in items:
+        raise ValueError("bad item")
+    return pd.DataFrame({"item": items, "doubled": [item * 2 for item in items]})
+
+
+def run_concurrently(batcher, items):
+    async def submit_all():
+        batcher.start()
+        try:
+            return await asyncio.gather(*map(batcher.submit, items), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    return asyncio.run(submit_all())
+
+
+def test_micro_batcher_scores_concurrent_items_together():
+    batcher = MicroBatcher(double, max_batch_size=10, max_wait=0.05)
+
+    results = run_concurrently(batcher, ["a", "b", "c"])
+
+    assert [result["doubled"].tolist() for result in results] == [["aa"], ["bb"], ["cc"]]
+    assert batcher.stats()["batch_sizes"] == {3: 1}
+
+
+def test_micro_batcher_limits_batch_size():
+    batcher = MicroBatcher(double, max_batch_size=2, max_wait=0.05)
+
+    run_concurrently(batcher, ["a", "b", "c"])
+
+    assert batcher.stats() == {"batches": 2, "items": 3, "mean_batch_size": 1.5, "batch_sizes": {1: 1, 2: 1}}
+
+
+def test_micro_batcher_isolates_failing_item():
+    batcher = MicroBatcher(double, max_batch_size=10, max_wait=0.05)
+
+    good, bad = run_concurrently(batcher, ["a", "bad"])
+
+    assert good["doubled"].tolist() == ["aa"]
+    with pytest.raises(ValueError):
+        raise bad
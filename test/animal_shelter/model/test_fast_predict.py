@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from animal_shelter.helper.data_loader import standardize
+from animal_shelter.model.domain import AnimalPrediction
+from animal_shelter.model.fast_predict import predict_micro_batch, predict_record
+from animal_shelter.model.predict import predict, predict_json
+
+
+def test_predict_record_matches_predict(model_path, animals_csv):
+    raw_data = standardize(pd.read_csv(animals_csv))
+
+    expected = predict(raw_data, model_path)
+    result = pd.DataFrame([predict_record(record, model_path) for record in raw_data.to_dict("records")])
+
+    assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("name, age, breed", [
+    (None, "Unknown", "Dachshund Longhair/Chihuahua Shorthair"),
+    ("Unknown", "3 weeks", "Siamese Mix"),
+    ("Rex", "2 years", "Domestic Medium Hair Mix"),
+])
+def test_predict_record_matches_predict_json(model_path, name, age, breed):
+    animal = AnimalPrediction(
+        id=1, name=name, date_time=datetime(2015, 1, 1), animal_type="Cat",
+        sex_upon_outcome="Intact Female", age_upon_outcome=age, breed=breed, color="Black",
+    )
+
+    expected = predict_json(animal, model_path).to_dict(orient="records")
+
+    assert [predict_record(animal, model_path)] == expected
+
+
+def test_predict_micro_batch_of_one_matches_predict_json(model_path):
+    animal = AnimalPrediction(
+        id=7, name="Rex", date_time=datetime(2015, 1, 1), animal_type="Dog",
+        sex_upon_outcome="Neutered Male", age_upon_outcome="2 years", breed="Labrador Mix", color="Black",
+    )
+
+    assert_frame_equal(predict_micro_batch([animal], model_path), predict_json(animal, model_path))
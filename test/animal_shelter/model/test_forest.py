@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from animal_shelter.helper.data_loader import standardize
+from animal_shelter.model import train
+from animal_shelter.model.forest import CompactForest, FlatForest, forest_predict_proba
+from animal_shelter.model.predict import _load_model, predict
+
+
+@pytest.fixture(scope="module")
+def raw_data(animals_csv):
+    return standardize(pd.read_csv(animals_csv))
+
+
+def test_flat_forest_matches_sklearn(model_path):
+    forest = _load_model(model_path).named_steps["model"]
+    x = np.random.default_rng(0).normal(size=(300, forest.n_features_in_))
+
+    result = FlatForest.from_forest(forest).predict_proba(x, batch_size=128)
+
+    np.testing.assert_allclose(result, forest.predict_proba(x), rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("engine", ["flat", "auto"])
+def test_predict_with_engine_matches_sklearn(model_path, raw_data, engine):
+    result = predict(raw_data, model_path, engine=engine)
+
+    assert_frame_equal(result, predict(raw_data, model_path), check_exact=False, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("engine", ["sklearn", "flat"])
+def test_compact_model_matches_sklearn(model_path, raw_data, tmp_path, engine):
+    compact_path = tmp_path / "compact_model.joblib"
+    train._save_model(_load_model(model_path), compact_path, "compact")
+
+    assert isinstance(_load_model(compact_path).named_steps["model"], CompactForest)
+    result = predict(raw_data, compact_path, engine=engine)
+    assert_frame_equal(result, predict(raw_data, model_path), check_exact=False, rtol=0, atol=1e-6)
+
+
+def test_forest_predict_proba_rejects_unknown_engine(model_path):
+    with pytest.raises(ValueError):
+        forest_predict_proba(_load_model(model_path), np.zeros((1, 9)), engine="gpu")
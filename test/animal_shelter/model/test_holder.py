@@ -0,0 +1,43 @@
+import os
+
+import joblib
+import pytest
+
+from animal_shelter.model import train
+from animal_shelter.model.holder import ModelHolder
+from animal_shelter.model.predict import predict
+from animal_shelter.model.warm_up import synthetic_animals
+
+
+@pytest.fixture
+def published_path(model_path, tmp_path):
+    path = tmp_path / "animal_model.gz"
+    train._save_model(joblib.load(model_path), path)
+    return path
+
+
+def test_holder_swaps_to_newly_published_model(published_path):
+    holder = ModelHolder(published_path, warm_up_rows=8, poll_interval=0)
+    old = holder.load()
+
+    assert not holder.reload()
+    new_version = train._save_model(joblib.load(published_path), published_path)
+
+    assert holder.reload()
+    assert holder.current.version == new_version != old.version
+    assert holder.stats.reloads == 1
+    # Requests that took the old model before the swap can still finish with it.
+    assert len(predict(synthetic_animals(5), old.pipeline)) == 5
+
+
+def test_holder_keeps_model_when_reload_fails(published_path):
+    holder = ModelHolder(published_path, warm_up_rows=8, poll_interval=0)
+    old = holder.load()
+
+    broken_path = published_path.with_name("broken.gz")
+    broken_path.write_bytes(b"not a model")
+    os.replace(broken_path, published_path)
+
+    assert not holder.reload()
+    assert holder.current is old
+    assert holder.stats.failures == 1
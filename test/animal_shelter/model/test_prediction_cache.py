@@ -0,0 +1,62 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from animal_shelter.feature.default_features import DefaultFeatures
+from animal_shelter.feature.enhancer import add_features
+from animal_shelter.helper.data_loader import standardize
+from animal_shelter.model.prediction_cache import PredictionCache, feature_keys, unique_rows
+from animal_shelter.model.predict import predict
+
+
+@pytest.fixture(scope="module")
+def raw_data(animals_csv):
+    # Repeat the animals so the batch holds duplicate feature vectors.
+    return standardize(pd.concat([pd.read_csv(animals_csv)] * 3, ignore_index=True))
+
+
+def test_predict_with_cache_matches_pipeline(model_path, raw_data):
+    model = joblib.load(model_path)
+    x = add_features(raw_data)[DefaultFeatures.CATEGORY_FEATURES + DefaultFeatures.NUM_FEATURES]
+    cache = PredictionCache(max_size=100)
+
+    first = predict(raw_data, model, cache=cache)
+    second = predict(raw_data, model, cache=cache)
+
+    np.testing.assert_array_equal(first.iloc[:, 2:].to_numpy(), model.predict_proba(x))
+    pd.testing.assert_frame_equal(first, second)
+    assert cache.stats.dedup_ratio > 2 / 3
+    assert cache.stats.hit_rate == 0.5
+
+
+def test_cache_is_keyed_on_model_version(model_path, raw_data):
+    model = joblib.load(model_path)
+    cache = PredictionCache(max_size=100)
+    predict(raw_data, model, cache=cache)
+
+    model.version_ = "retrained"
+    predict(raw_data, model, cache=cache)
+
+    assert cache.stats.hits == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PredictionCache(max_size=2)
+    cache.put_many(["a", "b"], np.eye(2))
+    cache.get_many(["a"])
+    cache.put_many(["c"], np.ones((1, 2)))
+
+    assert [value is not None for value in cache.get_many(["a", "b", "c"])] == [True, False, True]
+
+
+def test_unique_rows_and_keys_treat_missing_values_as_equal():
+    x = pd.DataFrame({"sex": ["male", "male", "female", "male"], "days": [np.nan, np.nan, 3.0, 3.0]})
+
+    unique, codes = unique_rows(x)
+
+    assert codes.tolist() == [0, 0, 1, 2]
+    assert feature_keys(unique, "v1", "sklearn") == [
+        ("v1", "sklearn", ("male", None)), ("v1", "sklearn", ("female", 3.0)), ("v1", "sklearn", ("male", 3.0)),
+    ]
+    assert feature_keys(x.iloc[[0]], "v1", "sklearn") == feature_keys(x.iloc[[1]], "v1", "sklearn")
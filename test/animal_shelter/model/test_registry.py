@@ -0,0 +1,33 @@
+import os
+
+import joblib
+
+from animal_shelter.model.registry import ModelRegistry
+
+
+def test_registry_loads_model_once(tmp_path):
+    model_path = tmp_path / "model.gz"
+    joblib.dump({"name": "model"}, model_path)
+    registry = ModelRegistry()
+
+    first = registry.get(model_path)
+    second = registry.get(model_path)
+
+    assert first is second
+    assert registry.stats.hits == 1
+    assert registry.stats.misses == 1
+    assert registry.stats.loads == 1
+
+
+def test_registry_reloads_changed_model(tmp_path):
+    model_path = tmp_path / "model.gz"
+    joblib.dump({"name": "old"}, model_path)
+    registry = ModelRegistry()
+    registry.warm_up(model_path)
+
+    joblib.dump({"name": "retrained"}, model_path)
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert registry.get(model_path) == {"name": "retrained"}
+    assert registry.stats.loads == 2
@@ -0,0 +1,61 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from animal_shelter.helper.data_loader import standardize
+from animal_shelter.model.predict import predict
+from animal_shelter.model.score import encode_chunks, read_chunks, score_chunks, score_file
+
+
+def test_score_file_in_chunks_matches_predict(model_path, animals_csv, tmp_path):
+    output_path = tmp_path / "scores.csv"
+
+    summary = score_file(animals_csv, output_path, model_path, chunk_size=20)
+
+    expected = predict(standardize(pd.read_csv(animals_csv)), model_path)
+    assert (summary.rows, summary.chunks) == (50, 3)
+    assert_frame_equal(pd.read_csv(output_path), expected)
+
+
+def test_score_file_to_parquet(model_path, animals_csv, tmp_path):
+    output_path = tmp_path / "scores.parquet"
+
+    summary = score_file(animals_csv, output_path, model_path, chunk_size=20)
+
+    assert summary.rows == 50
+    assert pd.read_parquet(output_path)["id"].tolist() == list(range(1, 51))
+
+
+def test_score_file_in_parallel_keeps_order(model_path, animals_csv, tmp_path):
+    sequential_path = tmp_path / "sequential.csv"
+    parallel_path = tmp_path / "parallel.csv"
+
+    score_file(animals_csv, sequential_path, model_path, chunk_size=7)
+    summary = score_file(animals_csv, parallel_path, model_path, chunk_size=7, workers=2)
+
+    assert summary.chunks == 8
+    assert_frame_equal(pd.read_csv(parallel_path), pd.read_csv(sequential_path))
+
+
+@pytest.mark.parametrize("output_format", ["json", "ndjson", "csv"])
+def test_encode_chunks_concatenates_to_one_document(model_path, animals_csv, output_format):
+    with open(animals_csv, "rb") as upload:
+        predictions = score_chunks(read_chunks(upload, 20), model_path)
+        document = b"".join(encode_chunks(predictions, output_format)).decode()
+
+    if output_format == "json":
+        decoded = pd.DataFrame(json.loads(document))
+    elif output_format == "ndjson":
+        decoded = pd.read_json(io.StringIO(document), lines=True, precise_float=True)
+    else:
+        decoded = pd.read_csv(io.StringIO(document))
+    expected = predict(standardize(pd.read_csv(animals_csv)), model_path)
+    # Streamed chunks round like the other prediction endpoints, to full precision.
+    assert_frame_equal(decoded, expected, check_exact=output_format != "csv")
+
+
+def test_encode_chunks_without_rows():
+    assert b"".join(encode_chunks(iter([]), "json")) == b"[]"
@@ -0,0 +1,64 @@
+import io
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from animal_shelter.helper.data_loader import standardize
+from animal_shelter.model.domain import AnimalPrediction, ColumnarAnimalPrediction
+from animal_shelter.model.predict import predict_animals, predict_columns
+from animal_shelter.model.tables import InvalidTableError, predict_table
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture(scope="module")
+def animals(animals_csv):
+    fields = list(AnimalPrediction.model_fields)
+    return standardize(pd.read_csv(animals_csv))[fields]
+
+
+@pytest.fixture(scope="module")
+def expected(animals, model_path):
+    return predict_animals([AnimalPrediction(**record) for record in animals.to_dict(orient="records")], model_path)
+
+
+def test_predict_columns_matches_json_list(animals, expected, model_path):
+    columnar = ColumnarAnimalPrediction(**animals.to_dict(orient="list"))
+
+    assert_frame_equal(predict_columns(columnar, model_path), expected)
+
+
+def test_columnar_batch_requires_equal_lengths(animals):
+    columns = animals.to_dict(orient="list")
+    columns["id"] = columns["id"][:3]
+
+    with pytest.raises(ValueError, match="same number of values"):
+        ColumnarAnimalPrediction(**columns)
+
+
+def _serialize(table: pa.Table, table_format: str) -> bytes:
+    sink = io.BytesIO()
+    if table_format == "arrow":
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink)
+    return sink.getvalue()
+
+
+@pytest.mark.parametrize("table_format", ["arrow", "parquet"])
+def test_predict_table_matches_json_list(animals, expected, model_path, table_format):
+    table = pa.Table.from_pandas(animals, preserve_index=False)
+    # Dictionary encoded text columns are accepted as well.
+    table = table.set_column(3, "animal_type", table.column("animal_type").dictionary_encode())
+
+    assert_frame_equal(predict_table(_serialize(table, table_format), table_format, model_path), expected)
+
+
+def test_predict_table_reports_invalid_columns(model_path):
+    table = pa.table({"id": ["a"], "animal_type": ["Dog"]})
+
+    with pytest.raises(InvalidTableError, match="id: unexpected type string; date_time: missing"):
+        predict_table(_serialize(table, "arrow"), "arrow", model_path)
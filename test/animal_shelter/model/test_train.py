@@ -1,9 +1,111 @@
+import os
+
+import joblib
+import pandas as pd
+import pytest
+
+from animal_shelter.feature.enhancer import add_features
+from animal_shelter.helper.data_loader import load_data
 from animal_shelter.model import train
 from animal_shelter.paths import DefaultPaths
 
 
 #TODO real unit test
-def test_train_model():
-    model = train.train("data/train.csv", DefaultPaths.OUTPUT_PATH / "test_animal_model.gz")
+def test_train_model(tmp_path):
+    model = train.train("data/train.csv", tmp_path / "test_animal_model.gz", feature_cache_dir=tmp_path / "cache")
 
     assert model is not None
+
+
+def test_incremental_train_adds_trees_for_appended_rows(tmp_path):
+    raw = pd.read_csv(DefaultPaths.DATA_PATH / "train.csv", nrows=2010)
+    data_path, model_path, cache_dir = tmp_path / "train.csv", tmp_path / "model.gz", tmp_path / "cache"
+    raw.iloc[:2000].to_csv(data_path, index=False)
+    first = train.train(data_path, model_path, incremental=True, feature_cache_dir=cache_dir)
+    n_trees = len(first.named_steps["model"].estimators_)
+
+    # Too few rows to hold every outcome, the missing ones are backfilled.
+    raw.iloc[2000:].to_csv(data_path, mode="a", header=False, index=False)
+    model = train.train(data_path, model_path, incremental=True, n_new_estimators=5, feature_cache_dir=cache_dir)
+
+    assert len(model.named_steps["model"].estimators_) == n_trees + 5
+    assert model.trained_rows_ == 2010
+    assert list(model.classes_) == list(first.classes_)
+    x, _ = train._split_target(add_features(load_data(data_path)))
+    assert model.predict_proba(x).shape == (2010, len(first.classes_))
+
+
+def test_incremental_train_falls_back_to_full_retrain(tmp_path):
+    raw = pd.read_csv(DefaultPaths.DATA_PATH / "train.csv", nrows=2000)
+    data_path, model_path, cache_dir = tmp_path / "train.csv", tmp_path / "model.gz", tmp_path / "cache"
+    raw.to_csv(data_path, index=False)
+    train.train(data_path, model_path, incremental=True, feature_cache_dir=cache_dir)
+
+    # A rewritten file with fewer rows cannot be an append.
+    raw.iloc[:1500].to_csv(data_path, index=False)
+    model = train.train(data_path, model_path, incremental=True, feature_cache_dir=cache_dir)
+
+    assert len(model.named_steps["model"].estimators_) == 100
+    assert model.trained_rows_ == 1500
+
+
+def test_incremental_train_retrains_rewritten_file(tmp_path):
+    raw = pd.read_csv(DefaultPaths.DATA_PATH / "train.csv", nrows=5010)
+    data_path, model_path, cache_dir = tmp_path / "train.csv", tmp_path / "model.gz", tmp_path / "cache"
+    raw.iloc[:2000].to_csv(data_path, index=False)
+    first = train.train(data_path, model_path, incremental=True, feature_cache_dir=cache_dir)
+
+    # At least as many rows as before, but none of them the rows the model was trained on.
+    raw.iloc[3000:].to_csv(data_path, index=False)
+    model = train.train(data_path, model_path, incremental=True, n_new_estimators=5, feature_cache_dir=cache_dir)
+
+    assert len(model.named_steps["model"].estimators_) == 100
+    assert model.trained_rows_ == 2010
+    assert model.feature_table_id_ != first.feature_table_id_
+
+
+def test_save_model_writes_manifest(model_path, tmp_path):
+    model = joblib.load(model_path)
+    compact_path, raw_path = tmp_path / "compact_model.joblib", tmp_path / "raw_model.joblib"
+    train._save_model(model, compact_path, "compact")
+    train._save_model(model, raw_path, "raw")
+
+    manifest = train.read_manifest(compact_path)
+    assert manifest["format"] == "compact"
+    assert manifest["n_trees"] == 10
+    assert manifest["n_nodes"] == sum(tree.tree_.node_count for tree in model.named_steps["model"].estimators_)
+    assert manifest["classes"] == model.classes_.tolist()
+    assert manifest["bytes"] < train.read_manifest(raw_path)["bytes"]
+
+
+def test_save_model_rejects_unknown_format(model_path, tmp_path):
+    with pytest.raises(ValueError):
+        train._save_model(joblib.load(model_path), tmp_path / "model.joblib", "pickle")
+
+
+def test_save_model_publishes_versions(model_path, tmp_path):
+    model = joblib.load(model_path)
+    path = tmp_path / "animal_model.gz"
+    versions = [train._save_model(model, path) for _ in range(train.KEEP_MODEL_VERSIONS + 1)]
+
+    kept = train.model_versions(path)
+    assert [version.name for version in kept] == [f"animal_model-{version}.gz" for version in versions[1:]]
+    assert joblib.load(path).version_ == versions[-1]
+    assert os.path.samefile(path, kept[-1]) or path.read_bytes() == kept[-1].read_bytes()
+    assert train.read_manifest(path)["version"] == versions[-1]
+
+
+def test_model_versions_ignore_file_times(model_path, tmp_path):
+    model = joblib.load(model_path)
+    path = tmp_path / "animal_model.gz"
+    versions = [train._save_model(model, path) for _ in range(train.KEEP_MODEL_VERSIONS)]
+
+    # Copying or touching the oldest version must not make it look new.
+    oldest = train.model_versions(path)[0]
+    os.utime(oldest, (2**31, 2**31))
+    newest = train._save_model(model, path)
+
+    assert [version.name for version in train.model_versions(path)] == [
+        f"animal_model-{version}.gz" for version in versions[1:] + [newest]
+    ]
+    assert not oldest.exists()
@@ -0,0 +1,23 @@
+import joblib
+import pandas as pd
+
+from animal_shelter.model import tune
+from animal_shelter.paths import DefaultPaths
+
+
+def test_tune_saves_best_pipeline_and_results(tmp_path):
+    data_path = tmp_path / "train.csv"
+    pd.read_csv(DefaultPaths.DATA_PATH / "train.csv", nrows=2000).to_csv(data_path, index=False)
+
+    summary = tune.tune(
+        data_path, tmp_path / "model.gz", tmp_path / "results.csv",
+        n_candidates=4, min_estimators=5, max_estimators=10, cv=2, n_jobs=1, random_state=0,
+        feature_cache_dir=tmp_path / "cache",
+    )
+
+    model = joblib.load(tmp_path / "model.gz")
+    results = pd.read_csv(tmp_path / "results.csv")
+    assert model.memory is None
+    assert model.named_steps["model"].n_estimators == summary.best_params["model__n_estimators"]
+    assert len(results) == summary.candidates
+    assert results["rank_test_score"].iloc[0] == 1
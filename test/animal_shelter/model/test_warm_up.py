@@ -0,0 +1,36 @@
+from animal_shelter.model.domain import AnimalPrediction
+from animal_shelter.model.prediction_cache import PREDICTION_CACHE
+from animal_shelter.model.warm_up import synthetic_animals, warm_up
+
+
+def test_synthetic_animals_are_valid_requests():
+    animals = synthetic_animals(20)
+
+    assert list(animals.columns) == list(AnimalPrediction.model_fields)
+    assert animals["id"].is_unique
+    for row in animals.to_dict("records"):
+        AnimalPrediction(**row)
+
+
+def test_warm_up_reports_batch_size_and_timing(model_path):
+    summary = warm_up(model_path, n_rows=16, engine="auto")
+
+    assert summary.rows == 16
+    assert summary.seconds == summary.load_seconds + summary.batch_seconds + summary.single_seconds
+    assert summary.as_dict()["seconds"] > 0
+
+
+def test_warm_up_without_rows_only_loads(model_path):
+    summary = warm_up(model_path, n_rows=0)
+
+    assert summary.rows == 0
+    assert summary.seconds == summary.load_seconds
+
+
+def test_warm_up_leaves_prediction_cache_alone(model_path):
+    PREDICTION_CACHE.clear()
+
+    warm_up(model_path, n_rows=16)
+
+    assert len(PREDICTION_CACHE) == 0
+    assert PREDICTION_CACHE.stats.rows == PREDICTION_CACHE.stats.hits + PREDICTION_CACHE.stats.misses == 0
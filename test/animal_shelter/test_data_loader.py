@@ -1,5 +1,7 @@
 from animal_shelter.helper import data_loader
+from animal_shelter.paths import DefaultPaths
 import logging
+import pandas as pd
 
 LOG = logging.getLogger(__name__)
 
@@ -7,3 +9,24 @@ def test_convert_camel_case():
     assert data_loader.convert_camel_case("CamelCase") == "camel_case"
     assert data_loader.convert_camel_case("CamelCASE") == "camel_case"
     assert data_loader.convert_camel_case("camel-case") == "camel-case"
+
+
+def test_standardize_fills_missing_per_column():
+    df = pd.DataFrame({
+        "DateTime": ["2014-02-12 18:22:00", "2013-10-13 12:44:00"],
+        "SexuponOutcome": pd.Categorical(["Neutered Male", None]),
+        "Name": ["Hambone", None],
+    })
+    result = data_loader.standardize(df)
+
+    assert list(result.columns) == ["date_time", "sex_upon_outcome", "name", "date"]
+    assert result["sex_upon_outcome"].tolist() == ["Neutered Male", "Unknown"]
+    assert isinstance(result["sex_upon_outcome"].dtype, pd.CategoricalDtype)
+    assert result["name"].tolist() == ["Hambone", "Unknown"]
+
+
+def test_load_data_typed():
+    result = data_loader.load_data(DefaultPaths.DATA_PATH / "train.csv", typed=True)
+
+    assert isinstance(result["breed"].dtype, pd.CategoricalDtype)
+    assert not result["outcome_subtype"].isna().any()
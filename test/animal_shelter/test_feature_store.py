@@ -0,0 +1,110 @@
+import os
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from animal_shelter.feature import store
+from animal_shelter.paths import DefaultPaths
+
+
+@pytest.fixture
+def outcomes_csv(tmp_path):
+    path = tmp_path / "outcomes.csv"
+    pd.read_csv(DefaultPaths.DATA_PATH / "train.csv", nrows=200).to_csv(path, index=False)
+    return path
+
+
+def test_load_features_reuses_cache(outcomes_csv, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    expected = store.load_features(outcomes_csv, cache_dir)
+
+    monkeypatch.setattr(store, "compute_features", lambda _: pytest.fail("features were recomputed"))
+    result = store.load_features(outcomes_csv, cache_dir)
+
+    assert len(list(cache_dir.iterdir())) == 1
+    assert_frame_equal(result, expected)
+
+
+def test_load_features_keeps_recently_used_tables(outcomes_csv, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(store, "KEEP_FEATURE_TABLES", 2)
+    tables = []
+    for value in [1, 2, 3]:
+        with open(outcomes_csv, "a") as csv_file:
+            csv_file.write(f"A00000{value},Rex,2015-01-01 10:00:00,Adoption,,Dog,Neutered Male,1 year,Beagle,Tan\n")
+        store.load_features(outcomes_csv, cache_dir)
+        tables.append(store.feature_cache_path(outcomes_csv, cache_dir))
+        # Distinct use times, whatever the resolution of file times.
+        os.utime(tables[-1], (value, value))
+
+    assert sorted(cache_dir.iterdir()) == sorted(tables[1:])
+
+
+def test_feature_cache_path_changes_with_content(outcomes_csv, tmp_path):
+    before = store.feature_cache_path(outcomes_csv, tmp_path)
+
+    with open(outcomes_csv, "a") as csv_file:
+        csv_file.write("A000001,Rex,2015-01-01 10:00:00,Adoption,,Dog,Neutered Male,1 year,Beagle,Tan\n")
+
+    assert store.feature_cache_path(outcomes_csv, tmp_path) != before
+
+
+def test_update_feature_table_only_processes_appended_rows(tmp_path, monkeypatch):
+    source = pd.read_csv(DefaultPaths.DATA_PATH / "train.csv", nrows=300)
+    csv_path = tmp_path / "outcomes.csv"
+    source[:200].to_csv(csv_path, index=False)
+    store.update_feature_table(csv_path, tmp_path)
+
+    source[200:].to_csv(csv_path, mode="a", header=False, index=False)
+    result = store.update_feature_table(csv_path, tmp_path)
+
+    (table_dir,) = tmp_path.glob("outcomes-*-incremental-*")
+    manifest = store.read_manifest(table_dir)
+    assert (manifest["rows"], len(manifest["parts"])) == (300, 2)
+    assert_frame_equal(result, store.compute_features(csv_path))
+
+
+def test_update_feature_table_rebuilds_rewritten_file(tmp_path):
+    source = pd.read_csv(DefaultPaths.DATA_PATH / "train.csv", nrows=100)
+    csv_path = tmp_path / "outcomes.csv"
+    source[:50].to_csv(csv_path, index=False)
+    store.update_feature_table(csv_path, tmp_path)
+
+    source[50:].to_csv(csv_path, index=False)
+    result = store.update_feature_table(csv_path, tmp_path)
+
+    assert result["animal_id"].tolist() == source["AnimalID"][50:].tolist()
+
+
+def test_feature_table_dir_differs_per_source_directory(tmp_path):
+    source = pd.read_csv(DefaultPaths.DATA_PATH / "train.csv", nrows=100)
+    cache_dir = tmp_path / "cache"
+    for name, rows in [("a", source[:40]), ("b", source[40:])]:
+        (tmp_path / name).mkdir()
+        rows.to_csv(tmp_path / name / "outcomes.csv", index=False)
+        store.update_feature_table(tmp_path / name / "outcomes.csv", cache_dir)
+
+    assert store.feature_table_dir(tmp_path / "a" / "outcomes.csv", cache_dir) != store.feature_table_dir(
+        tmp_path / "b" / "outcomes.csv", cache_dir
+    )
+    result = store.update_feature_table(tmp_path / "a" / "outcomes.csv", cache_dir)
+    assert result["animal_id"].tolist() == source["AnimalID"][:40].tolist()
+
+
+def test_update_feature_table_merges_parts(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, "MAX_TABLE_PARTS", 2)
+    source = pd.read_csv(DefaultPaths.DATA_PATH / "train.csv", nrows=200)
+    csv_path = tmp_path / "outcomes.csv"
+    source[:50].to_csv(csv_path, index=False)
+    store.update_feature_table(csv_path, tmp_path)
+    for start in [50, 100, 150]:
+        source[start:start + 50].to_csv(csv_path, mode="a", header=False, index=False)
+        result = store.update_feature_table(csv_path, tmp_path)
+
+    table_dir = store.feature_table_dir(csv_path, tmp_path)
+    manifest = store.read_manifest(table_dir)
+    assert (manifest["rows"], len(manifest["parts"])) == (200, 2)
+    assert sorted(path.name for path in table_dir.glob("part-*")) == sorted(manifest["parts"])
+    assert_frame_equal(result, store.compute_features(csv_path))
+    assert_frame_equal(store.update_feature_table(csv_path, tmp_path), result)
@@ -46,3 +46,29 @@ def test_get_neutered():
 
     expected = pd.Series(["fixed", "fixed", "intact", "unknown", "unknown"])
     assert_series_equal(result, expected)
+
+
+def test_compute_days_upon_outcome():
+    s = pd.Series(["1 year", "2 weeks", "3 months", "1 day", "Unknown", "1 year"])
+    result = enhancer.compute_days_upon_outcome(s)
+
+    expected = pd.Series([365.0, 14.0, 90.0, 1.0, float("nan"), 365.0])
+    assert_series_equal(result, expected)
+
+
+def test_add_features_memoize_matches_default():
+    df = pd.DataFrame({
+        "animal_type": ["Dog", "Cat", "Dog"],
+        "name": ["Ivo", "unknown", "Ivo"],
+        "sex_upon_outcome": ["Neutered Male", "Intact Female", "Neutered Male"],
+        "breed": ["Labrador Mix", "Domestic Shorthair Mix", "Labrador Mix"],
+        "age_upon_outcome": ["1 year", "Unknown", "1 year"],
+    })
+    default = enhancer.add_features(df)
+    memoized = enhancer.add_features(df, memoize=True)
+
+    for column in ["sex", "neutered", "hair_type"]:
+        assert isinstance(memoized[column].dtype, pd.CategoricalDtype)
+        assert_series_equal(memoized[column].astype(object), default[column].astype(object))
+    for column in ["is_dog", "has_name", "days_upon_outcome"]:
+        assert_series_equal(memoized[column], default[column])
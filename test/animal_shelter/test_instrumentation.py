@@ -0,0 +1,55 @@
+import tracemalloc
+
+import pandas as pd
+
+from animal_shelter.feature.enhancer import add_features
+from animal_shelter.helper import instrumentation
+from animal_shelter.helper.data_loader import load_data
+from animal_shelter.paths import DefaultPaths
+
+
+def test_profile_records_nested_stages():
+    with instrumentation.profile() as report:
+        data = add_features(load_data(DefaultPaths.DATA_PATH / "train.csv"))
+        with instrumentation.stage("custom", rows=3):
+            pd.Series(range(1000))
+
+    records = {record["name"]: record for record in report.as_dicts()}
+    assert records["load_data"]["rows"] == len(data)
+    assert records["add_features"]["depth"] == 0
+    assert records["get_sex"]["depth"] == 1
+    assert records["custom"]["rows"] == 3
+    # The peak of a stage includes the peaks of the stages it called.
+    assert records["add_features"]["peak_bytes"] >= records["get_hair_type"]["peak_bytes"] > 0
+
+    summary = report.summary()
+    assert summary.loc["get_sex", "calls"] == 1
+    assert not instrumentation.is_enabled()
+
+
+def test_disabled_instrumentation_records_nothing():
+    report = instrumentation.enable(track_memory=False)
+    instrumentation.disable()
+
+    data = add_features(load_data(DefaultPaths.DATA_PATH / "train.csv"))
+    with instrumentation.stage("custom") as record:
+        pass
+
+    assert record is None
+    assert len(data) > 0
+    assert report.as_dicts() == []
+
+
+def test_disable_leaves_tracing_started_elsewhere_running():
+    tracemalloc.start()
+    try:
+        with instrumentation.profile():
+            pd.Series(range(1000))
+
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+    with instrumentation.profile():
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
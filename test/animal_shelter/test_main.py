@@ -0,0 +1,295 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+import joblib
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+from fastapi.testclient import TestClient
+
+from animal_shelter import main
+from animal_shelter.main import app
+from animal_shelter.model.warm_up import synthetic_animals
+from animal_shelter.paths import DefaultPaths
+from animal_shelter.settings import DefaultSettings
+
+
+@pytest.fixture
+def client(request, model_path, monkeypatch):
+    """Client of the app serving the test model, once it reports ready.
+
+    Parametrize indirectly with a dict to override DefaultSettings.
+    """
+    monkeypatch.setattr(DefaultPaths, "ANIMAL_MODEL_PATH", model_path)
+    settings = {"WARM_UP_ROWS": 16, "MODEL_RELOAD_INTERVAL": 0, **getattr(request, "param", {})}
+    for name, value in settings.items():
+        monkeypatch.setattr(DefaultSettings, name, value)
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 60
+        while client.get("/readyz").status_code != 200:
+            assert time.monotonic() < deadline, client.get("/readyz").json()
+            time.sleep(0.05)
+        yield client
+
+
+@pytest.mark.parametrize("client", [{"WARM_UP_ROWS": 0}], indirect=True)
+def test_readyz_without_warm_up(client):
+    readiness = client.get("/readyz").json()
+
+    assert readiness["status"] == "ready"
+    assert readiness["warm_up"]["rows"] == 0
+
+
+@pytest.mark.parametrize("output_format", ["json", "ndjson", "csv"])
+def test_predictions_file_streams_every_chunk(client, animals_csv, monkeypatch, output_format):
+    monkeypatch.setattr(DefaultSettings, "UPLOAD_CHUNK_ROWS", 7)
+    upload = animals_csv.read_bytes()
+
+    response = client.post(
+        "/predictions/file", params={"format": output_format}, files={"file": ("animals.csv", upload, "text/csv")}
+    )
+
+    assert response.status_code == 200
+    body = io.BytesIO(response.content)
+    if output_format == "csv":
+        predictions = pd.read_csv(body)
+    else:
+        predictions = pd.read_json(body, orient="records", lines=output_format == "ndjson")
+    # 50 rows in chunks of 7 cross several chunk boundaries.
+    assert len(predictions) == len(pd.read_csv(animals_csv)) == 50
+
+
+class BusySlots:
+    """Slots of the prediction pool where, once busy, other requests take every freed slot."""
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.busy = False
+
+    def acquire(self, blocking=True):
+        return False if self.busy else self.slots.acquire(blocking)
+
+    def release(self):
+        if not self.busy:
+            self.slots.release()
+
+
+@pytest.mark.parametrize("client", [{"PREDICTION_WORKERS": 1, "PREDICTION_QUEUE_SIZE": 1}], indirect=True)
+def test_predictions_file_finishes_while_pool_is_full(client, animals_csv, monkeypatch):
+    monkeypatch.setattr(DefaultSettings, "UPLOAD_CHUNK_ROWS", 10)
+    slots = BusySlots(app.state.executor._slots)
+    monkeypatch.setattr(app.state.executor, "_slots", slots)
+    observe_batch_sizes = main._observe_batch_sizes
+
+    def fill_pool_after_first_chunk(predictions, route):
+        for n_chunks, chunk in enumerate(observe_batch_sizes(predictions, route)):
+            slots.busy = n_chunks >= 1
+            yield chunk
+
+    monkeypatch.setattr(main, "_observe_batch_sizes", fill_pool_after_first_chunk)
+    response = client.post("/predictions/file", files={"file": ("animals.csv", animals_csv.read_bytes(), "text/csv")})
+
+    assert slots.busy
+    assert response.status_code == 200
+    assert len(response.json()) == 50
+
+
+def _metric_value(metrics: str, sample: str) -> float:
+    return sum(float(line.rsplit(" ", 1)[1]) for line in metrics.splitlines() if line.startswith(sample + " "))
+
+
+def test_metrics_cover_the_whole_streamed_response(client, animals_csv, monkeypatch):
+    monkeypatch.setattr(DefaultSettings, "UPLOAD_CHUNK_ROWS", 10)
+    observe_batch_sizes = main._observe_batch_sizes
+
+    def slow_after_first_chunk(predictions, route):
+        for n_chunks, chunk in enumerate(observe_batch_sizes(predictions, route)):
+            if n_chunks == 1:
+                time.sleep(0.3)
+            yield chunk
+
+    monkeypatch.setattr(main, "_observe_batch_sizes", slow_after_first_chunk)
+    labels = '{method="POST",route="/predictions/file"}'
+    before = client.get("/metrics").text
+
+    response = client.post("/predictions/file", files={"file": ("animals.csv", animals_csv.read_bytes(), "text/csv")})
+    metrics = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert float(response.headers["X-Process-Time"]) < 0.3
+    assert metrics.headers["content-type"].startswith("text/plain")
+    latency = "animal_shelter_http_request_duration_seconds_sum" + labels
+    assert _metric_value(metrics.text, latency) - _metric_value(before, latency) >= 0.3
+    requests = 'animal_shelter_http_requests_total{method="POST",route="/predictions/file",status="200"}'
+    assert _metric_value(metrics.text, requests) - _metric_value(before, requests) == 1
+    # Only the /metrics request itself is still in flight.
+    assert _metric_value(metrics.text, "animal_shelter_http_requests_in_flight") == 1
+
+
+@pytest.mark.parametrize("status", ["loading", "training", "warming up"])
+def test_not_ready_until_the_model_is(client, monkeypatch, status):
+    monkeypatch.setattr(app.state, "model_status", status)
+    animal = _animals(1)[0]
+
+    readiness = client.get("/readyz")
+    prediction = client.post("/predictions/json", json=animal)
+
+    assert (readiness.status_code, readiness.json()) == (503, {"status": status})
+    assert prediction.status_code == 503
+    assert prediction.headers["Retry-After"] == "1"
+    assert client.post("/predictions/json-list", json={"predictions": [animal]}).status_code == 503
+
+
+@pytest.mark.parametrize("saved", [True, False])
+def test_load_or_train_model_trains_only_without_model(model_path, tmp_path, monkeypatch, saved):
+    from animal_shelter.model import train
+
+    path = tmp_path / "animal_model.gz"
+    if saved:
+        shutil.copy(model_path, path)
+    trained = []
+
+    def fake_train(data_path, output_path):
+        trained.append(output_path)
+        shutil.copy(model_path, output_path)
+
+    monkeypatch.setattr(train, "train", fake_train)
+    monkeypatch.setattr(DefaultSettings, "MODEL_RELOAD_INTERVAL", 0)
+    monkeypatch.setattr(DefaultSettings, "WARM_UP_ROWS", 0)
+    fake_app = SimpleNamespace(state=SimpleNamespace(model_status="loading"))
+
+    main._load_or_train_model(fake_app, path)
+
+    assert trained == ([] if saved else [path])
+    assert fake_app.state.model_status == "warming up"
+    assert fake_app.state.model_holder.current is not None
+
+
+def test_importing_the_app_leaves_out_pandas_and_sklearn():
+    script = "import sys, animal_shelter.main; print(sorted({'pandas', 'sklearn', 'joblib'} & set(sys.modules)))"
+    env = {**os.environ, "PYTHONPATH": str(Path(main.__file__).parents[1])}
+
+    output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True, env=env)
+
+    assert output.stdout.strip() == "[]"
+
+
+def _animals(n_rows: int) -> list[dict]:
+    return json.loads(synthetic_animals(n_rows).to_json(orient="records", date_format="iso"))
+
+
+def test_predictions_name_the_model_version(client, model_path, animals_csv):
+    version = joblib.load(model_path).version_
+    animals = _animals(3)
+    upload = animals_csv.read_bytes()
+
+    responses = [
+        client.post("/predictions/json", json=animals[0]),
+        client.post("/predictions/json-list", json={"predictions": animals}),
+        client.post("/predictions/file", files={"file": ("animals.csv", upload, "text/csv")}),
+    ]
+
+    assert app.state.model_holder.current.version == version
+    assert [response.headers["X-Model-Version"] for response in responses] == [version] * 3
+
+
+@pytest.mark.parametrize("route", ["/predictions/json", "/predictions/json-list"])
+def test_columns_layout_matches_records(client, route):
+    animals = _animals(4)
+    payload = animals[0] if route == "/predictions/json" else {"predictions": animals}
+
+    records = client.post(route, json=payload).json()
+    columns = client.post(route, params={"layout": "columns"}, json=payload).json()
+
+    assert columns == pd.DataFrame(records).to_dict(orient="list")
+    assert client.post(route, params={"layout": "rows"}, json=payload).status_code == 422
+
+
+def test_json_columns_matches_json_list(client):
+    animals = _animals(4)
+
+    records = client.post("/predictions/json-list", json={"predictions": animals}).json()
+    columns = client.post("/predictions/json-columns", json=pd.DataFrame(animals).to_dict(orient="list"))
+
+    assert columns.status_code == 200
+    assert columns.json() == records
+    assert client.post("/predictions/json-columns", json={"id": [1, 2]}).status_code == 422
+
+
+@pytest.mark.parametrize("media_type", ["application/vnd.apache.arrow.stream", "application/vnd.apache.parquet"])
+def test_table_matches_json_list(client, media_type):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    animals = synthetic_animals(4)
+    table = pa.Table.from_pandas(animals, preserve_index=False)
+    body = pa.BufferOutputStream()
+    if media_type.endswith("arrow.stream"):
+        with pa.ipc.new_stream(body, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, body)
+
+    response = client.post("/predictions/table", content=body.getvalue().to_pybytes(),
+                           headers={"Content-Type": media_type})
+
+    assert response.status_code == 200
+    assert response.json() == client.post("/predictions/json-list", json={"predictions": _animals(4)}).json()
+    assert client.post("/predictions/table", content=b"not a table",
+                       headers={"Content-Type": media_type}).status_code == 422
+
+
+def test_table_rejects_other_content_types(client):
+    response = client.post("/predictions/table", content=b"id\n1\n", headers={"Content-Type": "text/csv"})
+
+    assert response.status_code == 415
+
+
+@pytest.mark.parametrize("client", [{"MICRO_BATCH_MAX_SIZE": 8, "MICRO_BATCH_MAX_WAIT_MS": 500}], indirect=True)
+def test_concurrent_single_predictions_share_batches(client):
+    animals = _animals(8)
+    expected = client.post("/predictions/json-list", json={"predictions": animals}).json()
+
+    with ThreadPoolExecutor(len(animals)) as pool:
+        responses = list(pool.map(lambda animal: client.post("/predictions/json", json=animal), animals))
+
+    # Each caller gets the row of its own animal, whichever batch it was scored in.
+    predictions = pd.DataFrame([row for response in responses for row in response.json()])
+    assert_frame_equal(predictions, pd.DataFrame(expected), check_exact=False)
+    stats = app.state.batcher.stats()
+    assert stats["items"] == len(animals)
+    assert stats["batches"] < len(animals)
+
+
+@pytest.mark.parametrize("status", ["loading", "ready"])
+def test_healthz_answers_whether_or_not_the_model_is_ready(client, monkeypatch, status):
+    monkeypatch.setattr(app.state, "model_status", status)
+
+    response = client.get("/healthz")
+
+    assert (response.status_code, response.json()) == (200, {"status": "ok"})
+
+
+@pytest.mark.parametrize("client", [{"PREDICTION_WORKERS": 1, "PREDICTION_QUEUE_SIZE": 1}], indirect=True)
+def test_full_pool_answers_503(client, animals_csv, monkeypatch):
+    slots = BusySlots(app.state.executor._slots)
+    slots.busy = True
+    monkeypatch.setattr(app.state.executor, "_slots", slots)
+    upload = animals_csv.read_bytes()
+
+    responses = [
+        client.post("/predictions/json-list", json={"predictions": _animals(2)}),
+        client.post("/predictions/file", files={"file": ("animals.csv", upload, "text/csv")}),
+    ]
+
+    assert [response.status_code for response in responses] == [503, 503]
+    assert all(response.headers["Retry-After"] == "1" for response in responses)
+    assert responses[0].json() == {"detail": "Too many predictions in progress"}
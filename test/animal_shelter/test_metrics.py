@@ -0,0 +1,38 @@
+import pytest
+
+from animal_shelter.helper.metrics import MetricsRegistry
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ["route"])
+    latency = registry.histogram("latency_seconds", "Latency", ["route"], buckets=[0.1, 1.0])
+    in_flight = registry.gauge("in_flight", "In flight")
+    registry.collector("loads_total", "Loads", "counter", lambda: [("loads_total", {}, 3)])
+
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    latency.observe(0.1, route="/a")
+    latency.observe(0.5, route="/a")
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/a"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 2' in lines
+    assert 'latency_seconds_count{route="/a"} 2' in lines
+    assert 'latency_seconds_sum{route="/a"} 0.6' in lines
+    assert "in_flight 1" in lines
+    assert "loads_total 3" in lines
+
+
+def test_register_twice_returns_same_metric():
+    registry = MetricsRegistry()
+
+    assert registry.counter("requests_total", "Requests") is registry.counter("requests_total", "Requests")
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests")
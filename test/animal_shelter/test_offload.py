@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+import pytest
+
+from animal_shelter.helper.offload import BoundedExecutor, QueueFullError
+
+
+def test_bounded_executor_runs_function():
+    executor = BoundedExecutor(workers=1, queue_size=0)
+
+    assert asyncio.run(executor.run(sum, [1, 2, 3])) == 6
+    executor.shutdown()
+
+
+def test_bounded_executor_rejects_when_full():
+    executor = BoundedExecutor(workers=1, queue_size=0)
+    release = threading.Event()
+
+    async def submit_two():
+        busy = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError):
+            await executor.run(sum, [1])
+        release.set()
+        return await busy
+
+    assert asyncio.run(submit_two()) is True
+    executor.shutdown()
+
+
+def test_lease_keeps_running_when_the_pool_is_full():
+    executor = BoundedExecutor(workers=1, queue_size=0)
+
+    async def run_leased():
+        lease = executor.lease()
+        with pytest.raises(QueueFullError):
+            await executor.run(sum, [1])
+        results = [await lease.run(sum, [1, 2]), await lease.run(sum, [3])]
+        cleaned = []
+        lease.release(lambda: cleaned.append(True))
+        return results, cleaned, await executor.run(sum, [4])
+
+    assert asyncio.run(run_leased()) == ([3, 3], [True], 4)
+    executor.shutdown()
@@ -0,0 +1,42 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from animal_shelter.helper import serialization
+
+
+@pytest.fixture
+def predictions():
+    return pd.DataFrame({
+        "id": np.array([1, 2], dtype="int64"),
+        "name": ["Rex", None],
+        "adoption": [0.1 + 0.2, 0.5],
+        "transfer": [1 / 3, 0.5],
+    })
+
+
+@pytest.mark.parametrize("has_orjson", [True, False])
+def test_frame_to_json_layouts(monkeypatch, predictions, has_orjson):
+    monkeypatch.setattr(serialization, "HAS_ORJSON", has_orjson and serialization.HAS_ORJSON)
+
+    records = json.loads(serialization.frame_to_json(predictions, "records"))
+    columns = json.loads(serialization.frame_to_json(predictions, "columns"))
+
+    assert records == predictions.to_dict(orient="records")
+    assert columns == predictions.to_dict(orient="list")
+
+
+def test_frame_to_json_rejects_unknown_layout(predictions):
+    with pytest.raises(ValueError):
+        serialization.frame_to_json(predictions, "rows")
+
+
+@pytest.mark.parametrize("has_orjson", [True, False])
+def test_frame_to_json_lines_matches_records(monkeypatch, predictions, has_orjson):
+    monkeypatch.setattr(serialization, "HAS_ORJSON", has_orjson and serialization.HAS_ORJSON)
+
+    lines = serialization.frame_to_json_lines(predictions).decode().splitlines()
+
+    assert [json.loads(line) for line in lines] == json.loads(serialization.frame_to_json(predictions, "records"))